@@ -0,0 +1,79 @@
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Startup time of the CLI: wall clock of a few invocations and, from
+# `python -X importtime`, the time spent importing and the slowest modules.
+#   python benchmarks/bench_startup.py --repeat 10 --top 5
+bench_dir = os.path.dirname(os.path.abspath(__file__))
+main_path = os.path.join(os.path.dirname(bench_dir), "main.py")
+sys.path.insert(0, bench_dir)
+
+from generate_problems import generate_contest
+
+# "import time: self [us] | cumulative | imported package", nested imports are indented
+import_line = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+def parse_importtime(stderr):
+    modules = []
+    for line in stderr.splitlines():
+        match = import_line.match(line)
+        if match:
+            _, cumulative, indent, name = match.groups()
+            modules.append((name, int(cumulative) / 1e6, len(indent) // 2))
+    return modules
+
+def run(args, cwd, env):
+    start = time.monotonic()
+    ret = subprocess.run([sys.executable, "-X", "importtime", main_path] + args, cwd=cwd, env=env, capture_output=True, text=True)
+    return time.monotonic() - start, ret
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the startup time of main.py")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per command, the median is reported")
+    parser.add_argument("--top", type=int, default=5, help="Number of slowest top-level imports to show per command")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        contest = generate_contest(os.path.join(tmp, "contest"), 1, 1, 1024, 1)
+        # Neither command reaches the network: a dry run only scans the
+        # problems, and an offline export stops at the empty API cache
+        commands = {
+            "cli --help": ["--help"],
+            "to-polygon --help": ["to-polygon", "--help"],
+            "to-polygon --dry-run": ["to-polygon", contest, "--dry-run", "--journal", ""],
+            "import-domjudge-contest --offline": [
+                "import-domjudge-contest", "--contest_id", "1", "--offline", "--api-cache", os.path.join(tmp, "api_cache"),
+            ],
+        }
+
+        env = dict(os.environ, POLYGON_API_KEY="bench-key", POLYGON_API_SECRET="bench-secret", DOMJUDGE_USERNAME="bench", DOMJUDGE_PASSWORD="bench")
+
+        print(f"{'Command':<36} {'Wall':>8} {'Imports':>8} {'Modules':>8}")
+        slowest = {}
+        for name, command in commands.items():
+            walls, imports = [], []
+            for _ in range(args.repeat):
+                wall, ret = run(command, tmp, env)
+                if ret.returncode != 0:
+                    print(f"{name} failed:\n{ret.stdout}{ret.stderr}")
+                    break
+                modules = parse_importtime(ret.stderr)
+                walls.append(wall)
+                imports.append(sum(seconds for _, seconds, depth in modules if depth == 0))
+            else:
+                print(f"{name:<36} {statistics.median(walls) * 1000:>6.0f}ms {statistics.median(imports) * 1000:>6.0f}ms {len(modules):>8}")
+                slowest[name] = sorted((m for m in modules if m[2] == 0), key=lambda m: -m[1])[:args.top]
+
+        for name, modules in slowest.items():
+            print(f"\n{name}:")
+            for module, seconds, _ in modules:
+                print(f"  {module:<32} {seconds * 1000:>6.1f}ms")
+
+if __name__ == "__main__":
+    main()
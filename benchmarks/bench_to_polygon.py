@@ -0,0 +1,161 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.request
+
+# End-to-end benchmark of `main.py to-polygon` against the mock server, which
+# runs in its own process so its memory does not count towards the upload.
+# Arguments the harness does not know are passed on to to-polygon, e.g.
+#   python benchmarks/bench_to_polygon.py --problems 8 --tests 50 --test-size 256K --latency 0.05 -- --test-workers 16
+bench_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(bench_dir))
+sys.path.insert(0, bench_dir)
+
+from generate_problems import generate_contest, parse_size
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def get_json(url):
+    with urllib.request.urlopen(url, timeout=10) as response:
+        return json.loads(response.read())
+
+def start_mock_server(latency, error_rate, throttle_rate, contest=None):
+    port = free_port()
+    command = [
+        sys.executable, os.path.join(bench_dir, "mock_server.py"),
+        "--port", str(port),
+        "--latency", str(latency),
+        "--error-rate", str(error_rate),
+        "--throttle-rate", str(throttle_rate),
+    ]
+    if contest is not None:
+        command += ["--contest", contest]
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            get_json(url + "/_stats")
+            return server, url
+        except OSError:
+            time.sleep(0.1)
+
+    server.kill()
+    raise RuntimeError("Mock server did not start")
+
+def tree_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for f in files:
+            total += os.path.getsize(os.path.join(root, f))
+    return total
+
+def peak_rss_mb():
+    # ru_maxrss is in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_to_polygon(url, contest, journal, extra_args, use_tracemalloc, verbose):
+    import polygon_api_calls
+    import main
+
+    polygon_api_calls.polygon_url = url + "/api/"
+    os.environ.setdefault("POLYGON_API_KEY", "bench-key")
+    os.environ.setdefault("POLYGON_API_SECRET", "bench-secret")
+
+    args = [contest, "--statement-cache", "", "--journal", journal] + extra_args
+    output = io.StringIO()
+
+    if use_tracemalloc:
+        tracemalloc.start()
+    rss_before = peak_rss_mb()
+    start = time.monotonic()
+    with contextlib.redirect_stdout(output):
+        main.to_polygon.main(args, standalone_mode=False)
+    elapsed = time.monotonic() - start
+
+    traced_peak = None
+    if use_tracemalloc:
+        traced_peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+
+    if verbose:
+        print(output.getvalue())
+
+    return elapsed, rss_before, peak_rss_mb(), traced_peak
+
+def run_domjudge(url, contest_id, problem_count):
+    import domjudge_api_calls
+
+    domjudge_api_calls.domjudge_url = url
+    start = time.monotonic()
+    index = domjudge_api_calls.SubmissionIndex(contest_id, "bench", "bench")
+    ret = index.fetch_sources([str(i + 1) for i in range(problem_count)])
+    return time.monotonic() - start, ret
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark to-polygon against a local mock server")
+    parser.add_argument("--contest", default=None, help="Existing DomJudge contest directory, generated when omitted")
+    parser.add_argument("--problems", type=int, default=4)
+    parser.add_argument("--tests", type=int, default=20)
+    parser.add_argument("--test-size", default="256K")
+    parser.add_argument("--pages", type=int, default=2)
+    parser.add_argument("--zip", action="store_true", help="Generate the problems as zips")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds the mock server adds to every request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--tracemalloc", action="store_true", help="Also report the peak of Python allocations (slower)")
+    parser.add_argument("--domjudge", action="store_true", help="Also time fetching the accepted sources from the DomJudge API")
+    parser.add_argument("--verbose", action="store_true", help="Show the output of to-polygon")
+    args, extra_args = parser.parse_known_args()
+    extra_args = [arg for arg in extra_args if arg != "--"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        contest = args.contest
+        if contest is None:
+            contest = generate_contest(
+                os.path.join(tmp, "contest"), args.problems, args.tests, parse_size(args.test_size), args.pages, as_zip=args.zip
+            )
+
+        problem_count = len(os.listdir(contest))
+        size = tree_size(contest) / 2**20
+        print(f"Contest: {problem_count} problems, {size:.1f} MB in {contest}")
+
+        server, url = start_mock_server(args.latency, args.error_rate, args.throttle_rate, None if args.zip else contest)
+        try:
+            elapsed, rss_before, rss_peak, traced_peak = run_to_polygon(
+                url, contest, os.path.join(tmp, "journal.jsonl"), extra_args, args.tracemalloc, args.verbose
+            )
+            stats = get_json(url + "/_stats")
+
+            print(f"Wall clock:    {elapsed:.2f}s")
+            print(f"Throughput:    {size / elapsed:.2f} MB/s, {stats['tests'] / elapsed:.1f} tests/s, {stats['problems'] / elapsed:.2f} problems/s")
+            print(f"Uploaded:      {stats['problems']} problems, {stats['tests']} tests")
+            print(f"Peak RSS:      {rss_peak:.1f} MB ({rss_before:.1f} MB before the upload)")
+            if traced_peak is not None:
+                print(f"Peak traced:   {traced_peak:.1f} MB")
+            print(f"Requests:      {sum(stats['calls'].values())}")
+            for method, count in sorted(stats["calls"].items(), key=lambda item: -item[1]):
+                print(f"  {method:<32} {count}")
+
+            if args.domjudge and not args.zip:
+                elapsed, results = run_domjudge(url, 1, problem_count)
+                failed = sum(1 for ret in results.values() if ret.is_err())
+                print(f"DomJudge sources: {elapsed:.2f}s for {problem_count} problems, {failed} failed")
+        finally:
+            server.terminate()
+            server.wait()
+
+if __name__ == "__main__":
+    main()
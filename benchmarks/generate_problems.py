@@ -0,0 +1,88 @@
+import os
+import random
+import shutil
+import zipfile
+from io import BytesIO
+
+from PyPDF2 import PdfWriter
+
+# Writes a synthetic DomJudge contest: `problems` problem directories (or zips)
+# with `tests` tests of `test_size` bytes each, a statement of `pages` pages and
+# a main.cpp. Test data is random so it does not compress away in zips.
+def blank_pdf(pages):
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=595, height=842)
+    buffer = BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+def random_test(size, rng):
+    line = 100
+    data = bytearray()
+    while len(data) < size:
+        data += rng.randbytes(min(line, size - len(data))).hex()[:line].encode() + b"\n"
+    return bytes(data[:size])
+
+def generate_problem(path, name, tests, test_size, pages, samples, rng):
+    os.makedirs(os.path.join(path, "data", "sample"), exist_ok=True)
+    os.makedirs(os.path.join(path, "data", "secret"), exist_ok=True)
+
+    with open(os.path.join(path, "problem.yaml"), "w") as f:
+        f.write(f"name: {name}\nlimits:\n  memory: 256\n")
+    with open(os.path.join(path, "domjudge-problem.ini"), "w") as f:
+        f.write("timelimit='1.0'\n")
+    with open(os.path.join(path, "problem.pdf"), "wb") as f:
+        f.write(blank_pdf(pages))
+    with open(os.path.join(path, "main.cpp"), "w") as f:
+        f.write(f"// {name}\nint main() {{ return 0; }}\n")
+
+    for i in range(tests):
+        sub = "sample" if i < samples else "secret"
+        with open(os.path.join(path, "data", sub, f"{i + 1:03}.in"), "wb") as f:
+            f.write(random_test(test_size, rng))
+        with open(os.path.join(path, "data", sub, f"{i + 1:03}.ans"), "w") as f:
+            f.write("0\n")
+
+def zip_problem(path):
+    with zipfile.ZipFile(path + ".zip", "w", zipfile.ZIP_DEFLATED) as zip_ref:
+        for root, _, files in os.walk(path):
+            for f in files:
+                full_path = os.path.join(root, f)
+                zip_ref.write(full_path, os.path.relpath(full_path, path))
+    shutil.rmtree(path)
+
+def generate_contest(path, problems=4, tests=20, test_size=1 << 20, pages=2, samples=1, as_zip=False, seed=0):
+    rng = random.Random(seed)
+    os.makedirs(path, exist_ok=True)
+
+    for i in range(problems):
+        problem_path = os.path.join(path, f"p{i + 1:03}")
+        generate_problem(problem_path, f"Bench Problem {i + 1}", tests, test_size, pages, min(samples, tests), rng)
+        if as_zip:
+            zip_problem(problem_path)
+
+    return path
+
+# Parses sizes like 512, 64K, 1M or 2G into bytes
+def parse_size(size):
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+    size = size.strip().upper().rstrip("B")
+    if size and size[-1] in units:
+        return int(float(size[:-1]) * units[size[-1]])
+    return int(size)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate a synthetic DomJudge contest")
+    parser.add_argument("path")
+    parser.add_argument("--problems", type=int, default=4)
+    parser.add_argument("--tests", type=int, default=20)
+    parser.add_argument("--test-size", default="1M")
+    parser.add_argument("--pages", type=int, default=2)
+    parser.add_argument("--zip", action="store_true", help="Write every problem as a zip")
+    args = parser.parse_args()
+
+    generate_contest(args.path, args.problems, args.tests, parse_size(args.test_size), args.pages, as_zip=args.zip)
+    print(f"Generated {args.problems} problems in {args.path}")
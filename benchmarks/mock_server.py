@@ -0,0 +1,343 @@
+import base64
+import email.parser
+import email.policy
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import threading
+import time
+import urllib.parse
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for Polygon (/api/<method>) and DomJudge (/api/v4/..., /login,
+# /jury/problems/<id>/export). It keeps just enough state for the calls made by
+# polygon_api_calls.py and domjudge_api_calls.py, and can add latency and fail
+# a fraction of the requests. GET /_stats reports the calls it received.
+class MockState:
+    def __init__(self, latency=0.0, error_rate=0.0, throttle_rate=0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.lock = threading.Lock()
+        self.calls = {}
+
+        # Polygon
+        self.problems = {}
+        self.next_id = 1
+
+        # DomJudge: contest id -> list of problems, problem id -> zip bytes, ...
+        self.contest_problems = {}
+        self.exports = {}
+        self.submissions = {}
+        self.judgements = {}
+        self.sources = {}
+
+    def count(self, method):
+        with self.lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+
+    # Serve the problem directories of a DomJudge tree as contest `contest_id`,
+    # with the main.cpp of each problem as its accepted submission
+    def add_domjudge_contest(self, contest_id, path):
+        contest_id = str(contest_id)
+        problems = []
+        submissions = []
+        judgements = []
+
+        for i, name in enumerate(sorted(os.listdir(path))):
+            problem_path = os.path.join(path, name)
+            if not os.path.isdir(problem_path):
+                continue
+
+            problem_id = str(i + 1)
+            problems.append({"id": problem_id, "label": name, "short_name": name})
+
+            buffer = io.BytesIO()
+            with zipfile.ZipFile(buffer, "w") as zip_ref:
+                for root, _, files in os.walk(problem_path):
+                    for f in files:
+                        if f == "main.cpp":
+                            continue
+                        full_path = os.path.join(root, f)
+                        zip_ref.write(full_path, os.path.relpath(full_path, problem_path))
+            self.exports[problem_id] = buffer.getvalue()
+
+            submission_id = str(1000 + i)
+            submissions.append({"id": submission_id, "problem_id": problem_id, "language_id": "cpp"})
+            judgements.append({"id": submission_id, "submission_id": submission_id, "judgement_type_id": "AC"})
+            main_path = os.path.join(problem_path, "main.cpp")
+            if os.path.exists(main_path):
+                with open(main_path, "rb") as f:
+                    self.sources[submission_id] = f.read()
+
+        self.contest_problems[contest_id] = problems
+        self.submissions[contest_id] = submissions
+        self.judgements[contest_id] = judgements
+
+def parse_multipart(content_type, body):
+    message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+        b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + body
+    )
+    params = {}
+    for part in message.iter_parts():
+        params[part.get_param("name", header="content-disposition")] = part.get_payload(decode=True)
+    return params
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, code, body, content_type="application/json", headers=None):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    # JSON reply with an ETag, answered with 304 when the client has it already
+    def reply_cacheable(self, data):
+        body = json.dumps(data).encode()
+        etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+        if self.headers.get("If-None-Match") == etag:
+            return self.reply(304, b"", headers={"ETag": etag})
+        return self.reply(200, body, headers={"ETag": etag})
+
+    # Latency and error injection. Returns True when the request was answered
+    def inject(self):
+        if self.state.latency:
+            time.sleep(self.state.latency)
+        if random.random() < self.state.throttle_rate:
+            self.reply(429, {"status": "FAILED", "comment": "Too many requests"})
+            return True
+        if random.random() < self.state.error_rate:
+            self.reply(500, {"status": "FAILED", "comment": "Injected error"})
+            return True
+        return False
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path == "/login":
+            form = urllib.parse.parse_qs(body.decode())
+            if form.get("_csrf_token") != ["mock-token"] or not form.get("_username"):
+                return self.reply(302, b"", "text/html", {"Location": "/login"})
+            return self.reply(302, b"", "text/html", {"Location": "/jury", "Set-Cookie": "PHPSESSID=mock; Path=/"})
+
+        method = self.path.rsplit("/", 1)[-1]
+        self.state.count(method)
+        if self.inject():
+            return
+
+        params = parse_multipart(self.headers["Content-Type"], body)
+        for key in ("apiKey", "time", "apiSig"):
+            if key not in params:
+                return self.reply(400, {"status": "FAILED", "comment": f"Missing {key}"})
+
+        with self.state.lock:
+            ret = polygon_method(self.state, method, params)
+        if isinstance(ret, bytes):
+            return self.reply(200, ret, "application/octet-stream")
+        code, result = ret
+        if code != 200:
+            return self.reply(code, {"status": "FAILED", "comment": result})
+        return self.reply(200, {"status": "OK", "result": result})
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path != "/_stats":
+            self.state.count("GET " + re.sub(r"/\d+", "/{id}", path))
+            if self.inject():
+                return
+
+        if path == "/_stats":
+            with self.state.lock:
+                stats = {
+                    "calls": self.state.calls,
+                    "problems": len(self.state.problems),
+                    "tests": sum(len(problem["tests"]) for problem in self.state.problems.values()),
+                }
+            return self.reply(200, stats)
+
+        if path == "/login":
+            page = b'<form method="post"><input type="hidden" name="_csrf_token" value="mock-token"></form>'
+            return self.reply(200, page, "text/html")
+
+        if path == "/jury":
+            return self.reply(200, b"<html>Jury</html>", "text/html")
+
+        match = re.fullmatch(r"/jury/problems/(\w+)/export", path)
+        if match and "PHPSESSID=mock" not in self.headers.get("Cookie", ""):
+            return self.reply(302, b"", "text/html", {"Location": "/login"})
+        if match and match.group(1) in self.state.exports:
+            headers = {"Content-Disposition": f'attachment; filename="problem-{match.group(1)}.zip"'}
+            return self.reply(200, self.state.exports[match.group(1)], "application/zip", headers)
+
+        match = re.fullmatch(r"/api/v4/contests/(\w+)/(problems|submissions|judgements)", path)
+        if match:
+            contest_id, what = match.groups()
+            data = {
+                "problems": self.state.contest_problems,
+                "submissions": self.state.submissions,
+                "judgements": self.state.judgements,
+            }[what].get(contest_id)
+            if data is not None:
+                return self.reply_cacheable(data)
+
+        match = re.fullmatch(r"/api/v4/contests/\w+/submissions/(\w+)/source-code", path)
+        if match and match.group(1) in self.state.sources:
+            source = base64.b64encode(self.state.sources[match.group(1)]).decode()
+            return self.reply_cacheable([{"filename": "main.cpp", "source": source}])
+
+        return self.reply(404, {"message": "Not found"})
+
+def polygon_method(state, method, params):
+    def text(key):
+        return params[key].decode()
+
+    # Problems belong to the API key that created them
+    owner = text("apiKey")
+
+    if method == "problems.list":
+        return 200, [{"id": problem["id"], "name": name} for (key, name), problem in state.problems.items() if key == owner]
+
+    if method == "problem.create":
+        name = text("name")
+        if (owner, name) in state.problems:
+            return 400, "You already have problem with such name"
+        state.problems[(owner, name)] = {
+            "id": state.next_id,
+            "info": {},
+            "checker": "",
+            "validator": "",
+            "statements": {},
+            "resources": {},
+            "files": {},
+            "solutions": {},
+            "tests": {},
+            "packages": [],
+        }
+        state.next_id += 1
+        return 200, {"id": state.problems[(owner, name)]["id"], "name": name}
+
+    problem = next((p for (key, _), p in state.problems.items() if key == owner and str(p["id"]) == text("problemId")), None)
+    if problem is None:
+        return 400, "Problem not found"
+
+    if method == "problem.updateInfo":
+        problem["info"] = {"timeLimit": int(text("timeLimit")), "memoryLimit": int(text("memoryLimit"))}
+        return 200, None
+    if method == "problem.info":
+        return 200, problem["info"]
+    if method == "problem.setChecker":
+        problem["checker"] = text("checker")
+        return 200, None
+    if method == "problem.checker":
+        return 200, problem["checker"]
+    if method == "problem.setValidator":
+        problem["validator"] = text("validator")
+        return 200, None
+    if method == "problem.validator":
+        return 200, problem["validator"]
+    if method == "problem.saveStatement":
+        problem["statements"][text("lang")] = {"name": text("name"), "legend": text("legend")}
+        return 200, None
+    if method == "problem.statements":
+        return 200, problem["statements"]
+    if method == "problem.saveStatementResource":
+        problem["resources"][text("name")] = len(params["file"])
+        return 200, None
+    if method == "problem.statementResources":
+        return 200, [{"name": name, "length": length} for name, length in problem["resources"].items()]
+    if method == "problem.saveFile":
+        problem["files"][text("name")] = params["file"]
+        return 200, None
+    if method == "problem.viewFile":
+        if text("name") not in problem["files"]:
+            return 400, "File not found"
+        return problem["files"][text("name")]
+    if method == "problem.saveSolution":
+        problem["solutions"][text("name")] = params["file"]
+        return 200, None
+    if method == "problem.viewSolution":
+        if text("name") not in problem["solutions"]:
+            return 400, "Solution not found"
+        return problem["solutions"][text("name")]
+    if method == "problem.saveTest":
+        index = int(text("testIndex"))
+        problem["tests"][index] = {
+            "index": index,
+            "manual": True,
+            "input": params["testInput"],
+            "useInStatements": text("testUseInStatements") == "true",
+        }
+        return 200, None
+    if method == "problem.tests":
+        tests = []
+        for index in sorted(problem["tests"]):
+            test = dict(problem["tests"][index])
+            if text("noInputs") == "true":
+                del test["input"]
+            else:
+                test["input"] = test["input"].decode("utf-8", "replace")
+            tests.append(test)
+        return 200, tests
+    if method == "problem.testInput":
+        index = int(text("testIndex"))
+        if index not in problem["tests"]:
+            return 400, "Test not found"
+        return problem["tests"][index]["input"]
+    if method == "problem.commitChanges":
+        return 200, None
+    if method == "problem.buildPackage":
+        problem["packages"].append({"id": len(problem["packages"]) + 1, "created": time.time()})
+        return 200, None
+    if method == "problem.packages":
+        # Packages take a second to build
+        return 200, [
+            {"id": package["id"], "state": "READY" if time.time() - package["created"] > 1 else "RUNNING", "comment": ""}
+            for package in problem["packages"]
+        ]
+
+    return 400, f"Unknown method {method}"
+
+# Start the server in a background thread. Returns (server, state, base_url)
+def start_server(latency=0.0, error_rate=0.0, throttle_rate=0.0, port=0):
+    state = MockState(latency, error_rate, throttle_rate)
+    handler = type("Handler", (MockHandler,), {"state": state})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state, f"http://127.0.0.1:{server.server_address[1]}"
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Mock Polygon and DomJudge server")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--contest", default=None, help="DomJudge tree served as contest 1")
+    parser.add_argument("--prepare-contest", type=int, default=2, help="Contest the exporter reads the accepted submissions from, also serving the --contest tree")
+    args = parser.parse_args()
+
+    server, state, url = start_server(args.latency, args.error_rate, args.throttle_rate, args.port)
+    if args.contest is not None:
+        state.add_domjudge_contest(1, args.contest)
+        # The exporter takes the solutions from the prepare contest
+        state.add_domjudge_contest(args.prepare_contest, args.contest)
+    print(f"Polygon API at {url}/api/, DomJudge at {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+import zipfile
+
+# Name of the file listing the blob behind every file of an exported problem
+manifest_name = ".blobs.json"
+
+# Name of a zip member inside the problem directory, with absolute paths and
+# "." and ".." parts dropped like zipfile's extractall does, so a member can
+# not be written outside of it. None when nothing is left of the name.
+def member_name(name):
+    parts = [part for part in name.replace("\\", "/").split("/") if part not in ("", ".", "..")]
+    if not parts:
+        return None
+    return "/".join(parts)
+
+# Content-addressed storage for exported problems. Every file is stored once
+# under objects/<first two hex digits>/<sha256>, and problem directories are
+# made of hardlinks to those blobs, so test data shared between problems or
+# contests only takes space once. Linked files must not be edited in place,
+# that would change the blob for every problem using it.
+class BlobStore:
+    def __init__(self, root):
+        self.root = root
+        self.stored_bytes = 0
+        self.reused_bytes = 0
+        self.lock = threading.Lock()
+
+    def blob_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], digest)
+
+    def has(self, digest):
+        return os.path.exists(self.blob_path(digest))
+
+    # Store the contents of a file object and return (sha256, size)
+    def put(self, f):
+        tmp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        tmp_path = os.path.join(tmp_dir, uuid.uuid4().hex)
+
+        h = hashlib.sha256()
+        size = 0
+        with open(tmp_path, "wb") as out:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+        digest = h.hexdigest()
+
+        if self.has(digest):
+            os.remove(tmp_path)
+            with self.lock:
+                self.reused_bytes += size
+        else:
+            os.makedirs(os.path.dirname(self.blob_path(digest)), exist_ok=True)
+            # Concurrent exports may store the same blob, the rename is atomic
+            os.replace(tmp_path, self.blob_path(digest))
+            with self.lock:
+                self.stored_bytes += size
+
+        return digest, size
+
+    # Make `dest` point to the blob, copying it when hardlinks are not possible
+    def link(self, digest, dest):
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        if os.path.exists(dest):
+            os.remove(dest)
+        try:
+            os.link(self.blob_path(digest), dest)
+        except OSError:
+            shutil.copyfile(self.blob_path(digest), dest)
+
+    # Build the problem directory `dest` from a DomJudge export zip and extra
+    # files (name in the problem -> path on disk), and write its manifest
+    def store_problem(self, zip_path, dest, extra_files=None):
+        manifest = {}
+
+        with zipfile.ZipFile(zip_path, "r") as zip_ref:
+            for info in zip_ref.infolist():
+                name = member_name(info.filename)
+                if info.is_dir() or name is None:
+                    continue
+                with zip_ref.open(info) as f:
+                    digest, size = self.put(f)
+                manifest[name] = {"sha256": digest, "size": size}
+
+        for name, path in (extra_files or {}).items():
+            name = member_name(name)
+            if name is None:
+                continue
+            with open(path, "rb") as f:
+                digest, size = self.put(f)
+            manifest[name] = {"sha256": digest, "size": size}
+
+        # Rebuild the directory so files removed from the problem disappear too
+        if os.path.isdir(dest):
+            shutil.rmtree(dest)
+        for name, blob in manifest.items():
+            path = os.path.join(dest, *name.split("/"))
+            self.link(blob["sha256"], path)
+            # Identifies the linked file, the hash only holds while it is unchanged
+            stat = os.stat(path)
+            blob["inode"] = stat.st_ino
+            blob["mtime_ns"] = stat.st_mtime_ns
+
+        os.makedirs(dest, exist_ok=True)
+        with open(os.path.join(dest, manifest_name), "w") as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+
+        return dest
+
+def read_manifest(path):
+    manifest_path = os.path.join(path, manifest_name)
+    if not os.path.isfile(manifest_path):
+        return {}
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    # A hand-edited manifest should not point outside of the problem either
+    return {name: blob for name, blob in manifest.items() if member_name(name) == name}
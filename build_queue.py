@@ -0,0 +1,86 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from result import Ok, Err, Result
+
+from polygon_api_calls import build_package, list_packages, submit_in_context
+
+# Starts package builds and waits for all of them at once, polling
+# problem.packages for every build concurrently with a growing interval.
+class BuildQueue:
+    def __init__(self, timeout=30 * 60, poll_interval=5, max_poll_interval=60, workers=8):
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.workers = workers
+        self.builds = {}
+        self.lock = threading.Lock()
+
+    def start(self, api_key, api_secret, problem_id, name):
+        # Remember the packages that already exist, the new one is the one to wait for
+        packages = list_packages(api_key, api_secret, problem_id)
+        if packages.is_err():
+            return packages
+
+        started = time.monotonic()
+        ret = build_package(api_key, api_secret, problem_id)
+        if ret.is_err():
+            return ret
+
+        with self.lock:
+            self.builds[name] = {
+                "api_key": api_key,
+                "api_secret": api_secret,
+                "problem_id": problem_id,
+                "known": {package["id"] for package in packages.unwrap()},
+                "started": started,
+            }
+
+        return ret
+
+    def _wait_one(self, build):
+        interval = self.poll_interval
+        deadline = build["started"] + self.timeout
+
+        while True:
+            time.sleep(min(interval, max(0, deadline - time.monotonic())))
+
+            packages = list_packages(build["api_key"], build["api_secret"], build["problem_id"])
+            if packages.is_ok():
+                new = [package for package in packages.unwrap() if package["id"] not in build["known"]]
+                if new:
+                    package = max(new, key=lambda package: package["id"])
+                    if package["state"] in ("READY", "FAILED"):
+                        return {
+                            "state": package["state"],
+                            "duration": time.monotonic() - build["started"],
+                            "comment": package.get("comment", ""),
+                        }
+
+            if time.monotonic() >= deadline:
+                return {
+                    "state": "TIMEOUT",
+                    "duration": time.monotonic() - build["started"],
+                    "comment": packages.unwrap_err() if packages.is_err() else "",
+                }
+
+            interval = min(self.max_poll_interval, interval * 1.5)
+
+    # Returns name -> {"state", "duration", "comment"} for every started build
+    def wait(self):
+        with self.lock:
+            builds = dict(self.builds)
+
+        if not builds:
+            return {}
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(builds)))) as executor:
+            futures = {name: submit_in_context(executor, self._wait_one, build) for name, build in builds.items()}
+            return {name: future.result() for name, future in futures.items()}
+
+# Build the package through the queue when there is one, fire and forget otherwise
+def request_build(api_key, api_secret, problem_id, name, builds=None):
+    if builds is None:
+        return build_package(api_key, api_secret, problem_id)
+
+    return builds.start(api_key, api_secret, problem_id, name)
@@ -0,0 +1,100 @@
+import hashlib
+import os
+import threading
+from result import Ok, Err, Result
+
+from problem_index import ProblemIndex
+
+# Read "key secret" pairs, one per line, from a file, and "key:secret" pairs,
+# comma separated, from POLYGON_API_KEYS. The pair in POLYGON_API_KEY and
+# POLYGON_API_SECRET comes first and is the primary account.
+def load_credentials(path=None):
+    credentials = []
+    if os.getenv("POLYGON_API_KEY") is not None and os.getenv("POLYGON_API_SECRET") is not None:
+        credentials.append((os.getenv("POLYGON_API_KEY"), os.getenv("POLYGON_API_SECRET")))
+
+    for pair in os.getenv("POLYGON_API_KEYS", "").split(","):
+        if pair.strip():
+            key, _, secret = pair.strip().partition(":")
+            if not key or not secret:
+                return Err(f"POLYGON_API_KEYS: expected key:secret, got \"{pair.strip()}\"")
+            credentials.append((key, secret))
+
+    if path is not None:
+        try:
+            with open(path) as f:
+                lines = f.readlines()
+        except OSError as e:
+            return Err(f"Could not read {path}: {e}")
+
+        for number, line in enumerate(lines, start=1):
+            line = line.split("#")[0].strip()
+            if line:
+                fields = line.split()
+                if len(fields) != 2:
+                    return Err(f"{path}:{number}: expected \"key secret\", got {len(fields)} fields")
+                credentials.append((fields[0], fields[1]))
+
+    # Drop duplicates, keeping the first occurence
+    unique = []
+    for key, secret in credentials:
+        if key not in [k for k, _ in unique]:
+            unique.append((key, secret))
+    return Ok(unique)
+
+# The problem cache of an additional key lives next to the one of the primary key
+def key_cache_path(cache_path, api_key):
+    if cache_path is None:
+        return None
+    root, ext = os.path.splitext(cache_path)
+    return f"{root}.{hashlib.sha256(api_key.encode()).hexdigest()[:8]}{ext}"
+
+# Spreads problems over several Polygon accounts. A problem always goes to the
+# account that already has it; new problems go to the account with the fewest
+# problems so far in this run. Every call for a problem then uses that
+# account, since a problem can only be edited by its owner.
+class CredentialPool:
+    def __init__(self, credentials, cache_path=None, max_age=24 * 60 * 60):
+        self.credentials = credentials
+        self.indexes = [
+            ProblemIndex(key, secret, cache_path if i == 0 else key_cache_path(cache_path, key), max_age)
+            for i, (key, secret) in enumerate(credentials)
+        ]
+        self.assigned = {}
+        self.lock = threading.Lock()
+
+    def primary(self):
+        api_key, api_secret = self.credentials[0]
+        return api_key, api_secret, self.indexes[0]
+
+    # (api_key, api_secret, problem_index) to use for the problem
+    def assign(self, problem_name):
+        with self.lock:
+            if problem_name not in self.assigned:
+                owners = [i for i, index in enumerate(self.indexes) if index.has(problem_name)]
+                if owners:
+                    self.assigned[problem_name] = owners[0]
+                else:
+                    load = [list(self.assigned.values()).count(i) for i in range(len(self.credentials))]
+                    self.assigned[problem_name] = load.index(min(load))
+
+            i = self.assigned[problem_name]
+
+        api_key, api_secret = self.credentials[i]
+        return api_key, api_secret, self.indexes[i]
+
+    # Polygon has no API call to share a problem, so list the problems that
+    # other accounts own and have to be shared with the primary one by hand
+    def share_report(self):
+        with self.lock:
+            assigned = dict(self.assigned)
+
+        lines = []
+        for i, (api_key, _) in enumerate(self.credentials[1:], start=1):
+            problems = sorted(name for name, owner in assigned.items() if owner == i)
+            if problems:
+                lines.append(f"Key {api_key[:8]}...: {', '.join(problems)}")
+
+        if not lines:
+            return None
+        return "Share these problems with the primary account on Polygon:\n  " + "\n  ".join(lines)
@@ -1,193 +1,651 @@
 import random
 import string
 import requests
+from requests.adapters import HTTPAdapter
 import os
-from dotenv import load_dotenv
 from result import Ok, Err, Result
 import base64
+import hashlib
+import json
+import re
+from profiling import traced
 
 import shutil
 import zipfile
 
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
 import time
 import os
+import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor
 
-domjudge_url = "https://judge.agm-contest.com"
+domjudge_url = os.getenv("DOMJUDGE_URL", "https://judge.agm-contest.com")
 prepare_contest = 2
 export_contests_dir = "./exported_contests"
+chromedriver_path = os.getenv("CHROMEDRIVER_PATH", "/usr/lib/chromium-browser/chromedriver")
+
+# A logged-in browser that exports problems one after the other.
+# Starting Chromium and logging in happens once per session instead of once per problem.
+# Selenium is only imported when a browser session starts, it is slow to load.
+class ExporterSession:
+    def __init__(self, username, password, download_dir=None, headless=True, timeout=120):
+        self.username = username
+        self.password = password
+        self.download_dir = download_dir or os.path.join(os.getcwd(), 'downloads')
+        self.headless = headless
+        self.timeout = timeout
+        self.driver = None
+
+    def start(self):
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+        from selenium.webdriver.chrome.options import Options
+
+        # Set up Chromium options
+        chrome_options = Options()
+        if self.headless:
+            chrome_options.add_argument("--headless")
+        
+        # Set up the download directory
+        os.makedirs(self.download_dir, exist_ok=True)
+        for f in os.listdir(self.download_dir):
+            if os.path.isfile(os.path.join(self.download_dir, f)):
+                os.remove(os.path.join(self.download_dir, f))
 
-def export_problem(contest_id, problem_id, username, password, headless=True):
-    # Set up Chromium options
-    chrome_options = Options()
-    if headless:
-        chrome_options.add_argument("--headless")
-    
-    # Set up the download directory
-    download_dir = os.path.join(os.getcwd(), 'downloads')
-    os.makedirs(download_dir, exist_ok=True)
-    for f in os.listdir(download_dir):
-        os.remove(os.path.join(download_dir, f))
-
-    prefs = {
-        "download.default_directory": download_dir,
-        "download.prompt_for_download": False,
-        "download.directory_upgrade": True,
-        "safebrowsing.enabled": True
-    }
-
-    chrome_options.add_experimental_option("prefs", prefs)
-
-    # Initialize the Service object for ChromiumDriver
-    service = Service("/usr/lib/chromium-browser/chromedriver")
-
-    # Initialize the WebDriver with Chromium
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-    
-    try:
-        # Open the problem export page
-        url = f"https://judge.agm-contest.com/login"
-        driver.get(url)
+        prefs = {
+            "download.default_directory": self.download_dir,
+            "download.prompt_for_download": False,
+            "download.directory_upgrade": True,
+            "safebrowsing.enabled": True
+        }
+
+        chrome_options.add_experimental_option("prefs", prefs)
+
+        # Initialize the Service object for ChromiumDriver
+        service = Service(chromedriver_path)
+
+        # Initialize the WebDriver with Chromium
+        self.driver = webdriver.Chrome(service=service, options=chrome_options)
+
+        return self.login()
+
+    def login(self):
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.common.keys import Keys
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.common.exceptions import TimeoutException
+
+        try:
+            self.driver.get(f"{domjudge_url}/login")
+
+            # Handle login if prompted
+            if "login" in self.driver.current_url.lower():
+                username_field = self.driver.find_element(By.ID, "username")
+                password_field = self.driver.find_element(By.ID, "inputPassword")
 
-        # Handle login if prompted
-        if "login" in driver.current_url.lower():
-            username_field = driver.find_element(By.ID, "username")
-            password_field = driver.find_element(By.ID, "inputPassword")
+                username_field.send_keys(self.username)
+                password_field.send_keys(self.password)
+                password_field.send_keys(Keys.RETURN)
 
-            username_field.send_keys(username)
-            password_field.send_keys(password)
-            password_field.send_keys(Keys.RETURN)
+                # We are logged in once DomJudge redirects away from the login page
+                WebDriverWait(self.driver, self.timeout).until(lambda d: "login" not in d.current_url.lower())
 
-        # Wait for a short period to ensure we are logged in
-        time.sleep(5)  # Adjust this time if necessary
+        except TimeoutException:
+            return Err("Login failed")
+        except Exception as e:
+            return Err(str(e))
 
-        # Open the problem export page
-        url = f"https://judge.agm-contest.com/jury/problems/{problem_id}/export"
-        driver.get(url)
+        return Ok(None)
 
-        # Wait for the download to complete by monitoring the download directory
-        download_complete = False
-        timeout = 120  # Set a maximum wait time in seconds
+    def _finished_downloads(self, before):
+        return [
+            f for f in os.listdir(self.download_dir)
+            if f not in before and not f.endswith('.crdownload') and not f.endswith('.tmp')
+        ]
+
+    # Wait until a new file shows up in the download directory and its size stops changing
+    def wait_for_download(self, before):
         start_time = time.time()
+        sizes = {}
 
-        while not download_complete:
-            # Check the download directory for any files without a .crdownload extension
-            downloaded_files = [f for f in os.listdir(download_dir) if not f.endswith('.crdownload')]
-            if downloaded_files:
-                download_complete = True
-                break
-            
-            # Check if the timeout has been reached
-            if time.time() - start_time > timeout:
-                return Err("Download timed out")
+        while time.time() - start_time <= self.timeout:
+            for f in self._finished_downloads(before):
+                size = os.path.getsize(os.path.join(self.download_dir, f))
+                if size > 0 and sizes.get(f) == size:
+                    return Ok(os.path.join(self.download_dir, f))
+                sizes[f] = size
 
-            time.sleep(1)  # Wait for 1 second before checking again
+            time.sleep(0.2)
 
-        return Ok(os.path.join(download_dir, downloaded_files[0]))
+        return Err("Download timed out")
 
-    except Exception as e:
-        return str(e)
-    
-    finally:
-        # Close the WebDriver
-        driver.quit()
+    def export_problem(self, problem_id):
+        try:
+            before = set(os.listdir(self.download_dir))
 
+            with traced("domjudge", "export") as trace:
+                # Open the problem export page
+                self.driver.get(f"{domjudge_url}/jury/problems/{problem_id}/export")
 
-def get_contest_problems(contest_id, username, password):
-    response = requests.get(f"{domjudge_url}/api/v4/contests/{contest_id}/problems", auth=(username, password))
+                ret = self.wait_for_download(before)
+                if ret.is_ok():
+                    trace["bytes_received"] = os.path.getsize(ret.unwrap())
+                trace["status"] = "ok" if ret.is_ok() else "error"
 
-    if response.status_code == 200:
-        return Ok(response.json())
-    else:
-        return Err(response.text)
-    
-def get_correct_submission_for_problem(contest_id, problem_id, username, password):
-    response = requests.get(f"{domjudge_url}/api/v4/contests/{contest_id}/submissions", auth=(username, password))
+            return ret
 
-    if response.status_code != 200:
-        return Err(response.text)
-    
-    submissions = response.json()
+        except Exception as e:
+            return Err(str(e))
 
-    # We also need all judgements
-    response = requests.get(f"{domjudge_url}/api/v4/contests/{contest_id}/judgements", auth=(username, password))
-    if response.status_code != 200:
-        return Err(response.text)
-    
-    judgements = response.json()
-
-    # Keep all judgements whose judgement_type_id is "AC" in a dictionary
-    ac_judgements = {}
-    for judgement in judgements:
-        if judgement["judgement_type_id"] == "AC":
-            ac_judgements[judgement["submission_id"]] = judgement
-
-    # Keep the lowest id submission that has an AC judgement
-    correct_submission = None
-    for submission in submissions:
-        if submission["problem_id"] == problem_id and submission["language_id"] == "cpp":
-            if submission["id"] in ac_judgements:
-                if correct_submission is None or submission["id"] > correct_submission["id"]:
-                    correct_submission = submission
-
-    if correct_submission is not None:
-        return Ok(correct_submission)
+    def started(self):
+        return self.driver is not None
+
+    def close(self):
+        # Close the WebDriver
+        if self.driver is not None:
+            self.driver.quit()
+            self.driver = None
+
+# Exports problems without a browser: logs in through the DomJudge login form
+# (with its CSRF token) on a pooled HTTP session and streams the export zip
+# straight to a file or file object.
+class HttpExporterSession:
+    def __init__(self, username, password, download_dir=None, timeout=120):
+        self.username = username
+        self.password = password
+        self.download_dir = download_dir or os.path.join(os.getcwd(), 'downloads')
+        self.timeout = timeout
+        self.session = None
+        # Set when the server does not behave like a plain DomJudge, exporting
+        # then needs the browser
+        self.unsupported = False
+
+    def start(self):
+        os.makedirs(self.download_dir, exist_ok=True)
+
+        self.session = requests.Session()
+        self.session.mount(domjudge_url, HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        return self.login()
+
+    def login(self):
+        try:
+            response = self.session.get(f"{domjudge_url}/login", timeout=self.timeout)
+            match = re.search(r'name="_csrf_token"\s+value="([^"]*)"', response.text) or re.search(
+                r'value="([^"]*)"\s+name="_csrf_token"', response.text
+            )
+            if match is None:
+                self.unsupported = True
+                return Err("Login failed: no CSRF token on the login page")
+
+            data = {
+                "_username": self.username,
+                "_password": self.password,
+                "_csrf_token": match.group(1),
+            }
+            response = self.session.post(f"{domjudge_url}/login", data=data, timeout=self.timeout)
+        except requests.RequestException as e:
+            return Err(str(e))
+
+        # DomJudge sends us back to the login page when the credentials are wrong
+        if response.status_code != 200 or "/login" in response.url:
+            return Err("Login failed")
+
+        return Ok(None)
+
+    def _get_export(self, problem_id):
+        return self.session.get(f"{domjudge_url}/jury/problems/{problem_id}/export", stream=True, timeout=self.timeout)
+
+    # Download the export zip of a problem into `target`, a path or a binary
+    # file object, by default a file named like DomJudge names it in the
+    # download directory. Returns the target.
+    def export_problem(self, problem_id, target=None):
+        try:
+            with traced("domjudge", "export") as trace:
+                response = self._get_export(problem_id)
+
+                # Log in again if the session expired
+                if "/login" in response.url:
+                    response.close()
+                    ret = self.login()
+                    if ret.is_err():
+                        return ret
+                    response = self._get_export(problem_id)
+
+                trace["status"] = response.status_code
+                with response:
+                    if response.status_code != 200:
+                        return Err(f"Export of problem {problem_id} failed with status {response.status_code}")
+
+                    chunks = response.iter_content(chunk_size=1 << 16)
+                    first = next(chunks, b"")
+                    if not first.startswith(b"PK"):
+                        self.unsupported = True
+                        return Err(f"Export of problem {problem_id} did not return a zip")
+
+                    if target is None:
+                        match = re.search(r'filename="?([^";]+)"?', response.headers.get("Content-Disposition", ""))
+                        name = os.path.basename(match.group(1)) if match else f"problem-{problem_id}.zip"
+                        target = os.path.join(self.download_dir, name)
+
+                    if isinstance(target, str):
+                        # Write next to the target and rename, so a failed download leaves nothing behind
+                        tmp_path = target + ".part"
+                        try:
+                            with open(tmp_path, "wb") as f:
+                                trace["bytes_received"] = self._write(f, first, chunks)
+                            os.replace(tmp_path, target)
+                        except BaseException:
+                            if os.path.exists(tmp_path):
+                                os.remove(tmp_path)
+                            raise
+                    else:
+                        trace["bytes_received"] = self._write(target, first, chunks)
+
+            return Ok(target)
+
+        except requests.RequestException as e:
+            return Err(str(e))
+
+    def _write(self, f, first, chunks):
+        size = len(first)
+        f.write(first)
+        for chunk in chunks:
+            f.write(chunk)
+            size += len(chunk)
+        return size
+
+    def started(self):
+        return self.session is not None
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+
+# Exports over HTTP and falls back to a browser when the server does not look
+# like a plain DomJudge, e.g. a different login form
+class FallbackExporterSession:
+    def __init__(self, username, password, download_dir=None, headless=True, timeout=120):
+        self.http = HttpExporterSession(username, password, download_dir, timeout)
+        self.browser = ExporterSession(username, password, download_dir, headless, timeout)
+        self.use_browser = False
+
+    def _start_browser(self, reason):
+        print(f"HTTP export failed ({reason}), falling back to the browser")
+        self.use_browser = True
+        self.http.close()
+        return self.browser.start()
+
+    def start(self):
+        ret = self.http.start()
+        if ret.is_err() and self.http.unsupported:
+            return self._start_browser(ret.unwrap_err())
+        return ret
+
+    def export_problem(self, problem_id):
+        if not self.use_browser:
+            ret = self.http.export_problem(problem_id)
+            if ret.is_ok() or not self.http.unsupported:
+                return ret
+
+            start = self._start_browser(ret.unwrap_err())
+            if start.is_err():
+                return start
+
+        return self.browser.export_problem(problem_id)
+
+    def started(self):
+        return self.browser.started() if self.use_browser else self.http.started()
+
+    def close(self):
+        self.http.close()
+        self.browser.close()
+
+# "http" tries plain HTTP first and falls back to the browser, "browser" always uses Selenium
+def exporter_session(exporter, username, password, download_dir=None):
+    if exporter == "browser":
+        return ExporterSession(username, password, download_dir)
+    return FallbackExporterSession(username, password, download_dir)
+
+def export_problem(contest_id, problem_id, username, password, exporter="http"):
+    session = exporter_session(exporter, username, password)
+    try:
+        ret = session.start()
+        if ret.is_err():
+            return ret
+
+        return session.export_problem(problem_id)
+    finally:
+        session.close()
+
+
+# Client for the DomJudge REST API on one pooled session. Responses can be
+# cached on disk, one file per URL: a cached response younger than its TTL is
+# used as is, an older one is revalidated with If-None-Match/If-Modified-Since
+# when the server sent an ETag or Last-Modified. In offline mode only the
+# cache is used.
+class DomJudgeClient:
+    def __init__(self, username, password, cache_dir=None, ttl=3600, offline=False, pool_size=8, timeout=120):
+        self.username = username
+        self.password = password
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.offline = offline
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        self.session.auth = (username, password)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _cache_path(self, url):
+        # Responses of different users may differ
+        key = hashlib.sha256(f"{self.username}\n{url}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], key + ".json")
+
+    def _read_cache(self, url):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._cache_path(url)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_cache(self, url, entry):
+        if not self.cache_dir:
+            return
+        path = self._cache_path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+    # GET /api/v4/<path>. ttl overrides the default, e.g. float("inf") for
+    # responses that never change
+    def get(self, path, ttl=None):
+        url = f"{domjudge_url}/api/v4/{path}"
+        ttl = self.ttl if ttl is None else ttl
+
+        cached = self._read_cache(url)
+        if cached is not None and (self.offline or time.time() - cached["fetched_at"] < ttl):
+            return Ok(cached["data"])
+        if self.offline:
+            return Err(f"{path} is not in the DomJudge cache")
+
+        headers = {}
+        if cached is not None and cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached is not None and cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        # contests/1/submissions/123/source-code is traced as submissions/source-code
+        parts = path.split("/")[2:] or path.split("/")
+        method = parts[0] if len(parts) == 1 else parts[0] + "/" + parts[-1]
+
+        with traced("domjudge", method) as trace:
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+            except requests.RequestException as e:
+                return Err(str(e))
+            trace["bytes_received"] = len(response.content)
+            trace["status"] = response.status_code
+
+        if response.status_code == 304 and cached is not None:
+            cached["fetched_at"] = time.time()
+            self._write_cache(url, cached)
+            return Ok(cached["data"])
+
+        if response.status_code != 200:
+            return Err(response.text)
+
+        data = response.json()
+        self._write_cache(url, {
+            "url": url,
+            "fetched_at": time.time(),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "data": data,
+        })
+        return Ok(data)
+
+    def close(self):
+        self.session.close()
+
+_domjudge_settings = {}
+_domjudge_clients = {}
+_domjudge_clients_lock = threading.Lock()
+
+# Settings (cache_dir, ttl, offline, pool_size) for the clients created from now on
+def configure_domjudge_client(**settings):
+    with _domjudge_clients_lock:
+        _domjudge_settings.clear()
+        _domjudge_settings.update(settings)
+        for client in _domjudge_clients.values():
+            client.close()
+        _domjudge_clients.clear()
+
+# The shared client of these credentials
+def get_domjudge_client(username, password):
+    with _domjudge_clients_lock:
+        if (username, password) not in _domjudge_clients:
+            _domjudge_clients[(username, password)] = DomJudgeClient(username, password, **_domjudge_settings)
+        return _domjudge_clients[(username, password)]
+
+def get_contest_problems(contest_id, username, password):
+    return get_domjudge_client(username, password).get(f"contests/{contest_id}/problems")
     
-    return Err("No correct submission found")
+# Picks the reference solution of every problem of a contest. The submissions
+# and judgements are downloaded once and indexed in a single pass, and the
+# sources of the chosen submissions are fetched once.
+class SubmissionIndex:
+    def __init__(self, contest_id, username, password):
+        self.contest_id = contest_id
+        self.username = username
+        self.password = password
+        self.client = get_domjudge_client(username, password)
+        self.correct = None
+        self.sources = {}
+        self.lock = threading.Lock()
+
+    def _get(self, path, ttl=None):
+        return self.client.get(f"contests/{self.contest_id}/{path}", ttl)
+
+    def load(self):
+        with self.lock:
+            if self.correct is not None:
+                return Ok(self.correct)
+
+            submissions = self._get("submissions")
+            if submissions.is_err():
+                return submissions
+
+            # We also need all judgements
+            judgements = self._get("judgements")
+            if judgements.is_err():
+                return judgements
+
+            # Keep the ids of all submissions with a judgement whose judgement_type_id is "AC"
+            ac_submissions = set()
+            for judgement in judgements.unwrap():
+                if judgement["judgement_type_id"] == "AC":
+                    ac_submissions.add(judgement["submission_id"])
+
+            # Keep the highest id C++ submission of each problem that has an AC judgement
+            correct = {}
+            for submission in submissions.unwrap():
+                if submission["language_id"] != "cpp" or submission["id"] not in ac_submissions:
+                    continue
+
+                problem_id = submission["problem_id"]
+                if problem_id not in correct or submission["id"] > correct[problem_id]["id"]:
+                    correct[problem_id] = submission
+
+            self.correct = correct
+            return Ok(correct)
+
+    def correct_submission(self, problem_id):
+        ret = self.load()
+        if ret.is_err():
+            return ret
+
+        if problem_id in self.correct:
+            return Ok(self.correct[problem_id])
+
+        return Err("No correct submission found")
+
+    # Source code of the chosen submission of the problem
+    def get_source(self, problem_id):
+        with self.lock:
+            if problem_id in self.sources:
+                return Ok(self.sources[problem_id])
+
+        correct_submission = self.correct_submission(problem_id)
+        if correct_submission.is_err():
+            return correct_submission
+
+        id = correct_submission.unwrap()["id"]
+        # The source of a submission never changes
+        response = self._get(f"submissions/{id}/source-code", float("inf"))
+        if response.is_err():
+            return response
+
+        # Take the "source" field from the response and decode it from base64
+        source = base64.b64decode(response.unwrap()[0]["source"]).decode()
+        with self.lock:
+            self.sources[problem_id] = source
+        return Ok(source)
+
+    # Download the sources of all the given problems at once
+    def fetch_sources(self, problem_ids, workers=4):
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            results = dict(zip(problem_ids, executor.map(self.get_source, problem_ids)))
+
+        return results
 
-def export_correct_submission_for_problem(contest_id, problem_id, username, password):
-    correct_submission = get_correct_submission_for_problem(contest_id, problem_id, username, password)
-    if correct_submission.is_err():
-        return correct_submission
+def get_correct_submission_for_problem(contest_id, problem_id, username, password):
+    return SubmissionIndex(contest_id, username, password).correct_submission(problem_id)
 
-    id = correct_submission.unwrap()["id"]
-    response = requests.get(f"{domjudge_url}/api/v4/contests/{contest_id}/submissions/{id}/source-code", auth=(username, password))
+def export_correct_submission_for_problem(contest_id, problem_id, username, password, index=None, filename=os.path.join("downloads", "main.cpp")):
+    if index is None:
+        index = SubmissionIndex(contest_id, username, password)
+
+    source = index.get_source(problem_id)
+    if source.is_err():
+        return source
 
     # Save the source code to a file in downloads
-    if response.status_code == 200:
-        filename = "downloads/main.cpp"
-        with open(filename, "w") as f:
-            # Take the "source" field from the response and decode it from base64
-            f.write(base64.b64decode(response.json()[0]["source"]).decode())
+    with open(filename, "w") as f:
+        f.write(source.unwrap())
 
-        
-        return Ok(filename)
-    
-    return Err(response.text)
+    return Ok(filename)
 
-def export_problem_with_submission(contest_id, problem_id, username, password):
+def export_problem_with_submission(contest_id, problem_id, username, password, session=None, index=None, extract=False, blob_store=None):
     # Export the problem
-    problem_file = export_problem(contest_id, problem_id, username, password)
+    if session is not None:
+        problem_file = session.export_problem(problem_id)
+    else:
+        problem_file = export_problem(contest_id, problem_id, username, password)
     print(problem_file)
     if problem_file.is_err():
         return problem_file
 
-    # Export the correct submission
-    submission_file = export_correct_submission_for_problem(prepare_contest, problem_id, username, password)
+    # Export the correct submission next to the downloaded problem
+    submission_path = os.path.join(os.path.dirname(problem_file.unwrap()), "main.cpp")
+    submission_file = export_correct_submission_for_problem(prepare_contest, problem_id, username, password, index, submission_path)
     print(submission_file)
     if submission_file.is_err():
         return submission_file
 
-    exported_problem_path = os.path.join(export_contests_dir, str(contest_id), str(problem_id))
-    os.makedirs(exported_problem_path, exist_ok=True)
+    exported_contest_path = os.path.join(export_contests_dir, str(contest_id))
+    os.makedirs(exported_contest_path, exist_ok=True)
+
+    # Problem directory made of links into the blob store
+    if blob_store is not None:
+        exported_problem_path = os.path.join(exported_contest_path, str(problem_id))
+        blob_store.store_problem(problem_file.unwrap(), exported_problem_path, {"main.cpp": submission_file.unwrap()})
+        os.remove(problem_file.unwrap())
+        return Ok(exported_problem_path)
+
+    if extract:
+        exported_problem_path = os.path.join(exported_contest_path, str(problem_id))
+        # Start from an empty directory: one built by a blob store export is
+        # made of hardlinks, writing through them would corrupt the blobs
+        if os.path.isdir(exported_problem_path):
+            shutil.rmtree(exported_problem_path)
+        os.makedirs(exported_problem_path, exist_ok=True)
+
+        # Unzip the problem file in the directory
+        with zipfile.ZipFile(problem_file.unwrap(), "r") as zip_ref:
+            zip_ref.extractall(exported_problem_path)
 
-    # Unzip the problem file in the directory
-    with zipfile.ZipFile(problem_file.unwrap(), "r") as zip_ref:
-        zip_ref.extractall(exported_problem_path)
+        # Copy the submission file
+        shutil.copy(submission_file.unwrap(), os.path.join(exported_problem_path, "main.cpp"))
 
-    # Copy the submission file
-    shutil.copy(submission_file.unwrap(), os.path.join(exported_problem_path, "main.cpp"))
+        return Ok(exported_problem_path)
+
+    # Keep the zip as it is, to_polygon reads it directly. The submission is
+    # appended to it so the zip has everything needed to upload the problem.
+    exported_problem_path = os.path.join(exported_contest_path, str(problem_id) + ".zip")
+    shutil.move(problem_file.unwrap(), exported_problem_path)
+    with zipfile.ZipFile(exported_problem_path, "a") as zip_ref:
+        zip_ref.write(submission_file.unwrap(), "main.cpp")
 
     return Ok(exported_problem_path)
 
-def export_contest(contest_id, username, password):
+# on_exported(problem_id, ret) is called from the export workers as soon as
+# each problem is exported, e.g. to start uploading it
+def export_contest(contest_id, username, password, workers=1, extract=False, blob_store=None, exporter="http", on_exported=None):
     # Get the list of problem IDs
     problems = get_contest_problems(contest_id, username, password)
 
-    # For each problem, first export it
-    for problem in problems.unwrap():
-        export_problem_with_submission(contest_id, problem["id"], username, password)
+    if problems.is_err():
+        return problems
+
+    # Pick the reference solutions of all problems at once
+    index = SubmissionIndex(prepare_contest, username, password)
+    ret = index.load()
+    if ret.is_err():
+        return ret
+    index.fetch_sources([problem["id"] for problem in problems.unwrap()])
+
+    # Every worker has its own logged-in session and its own download directory
+    sessions = queue.Queue()
+    for i in range(max(1, workers)):
+        sessions.put(exporter_session(exporter, username, password, os.path.join(os.getcwd(), "downloads", f"worker{i}")))
+
+    def export(problem_id):
+        session = sessions.get()
+        start = time.monotonic()
+        try:
+            if not session.started():
+                ret = session.start()
+                if ret.is_err():
+                    session.close()
+                    return ret, time.monotonic() - start
+
+            try:
+                ret = export_problem_with_submission(contest_id, problem_id, username, password, session, index, extract, blob_store)
+            except Exception as e:
+                ret = Err(str(e))
+            return ret, time.monotonic() - start
+        finally:
+            sessions.put(session)
+
+    def export_and_report(problem_id):
+        ret, elapsed = export(problem_id)
+        if on_exported is not None:
+            on_exported(problem_id, ret)
+        return ret, elapsed
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            problem_ids = [problem["id"] for problem in problems.unwrap()]
+            results = dict(zip(problem_ids, executor.map(export_and_report, problem_ids)))
+    finally:
+        while not sessions.empty():
+            sessions.get().close()
+
+    return Ok(results)
@@ -0,0 +1,84 @@
+import hashlib
+import json
+import os
+import threading
+from result import Ok, Err, Result
+
+# Append-only record of the upload steps that succeeded, one JSON line per step:
+# {"problem": name, "step": "limits", "hash": ..., "value": ...}. The hash is
+# taken over the local content the step uploaded, so when resuming a step is
+# only skipped if that content did not change since it was recorded.
+class Journal:
+    def __init__(self, path=None, resume=False):
+        self.path = path
+        self.entries = {}
+        self.seen = {}
+        self.lock = threading.Lock()
+        self.file = None
+
+        if path is None:
+            return
+
+        if resume and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Last line cut short by a crash
+                        continue
+                    self.entries[(entry["problem"], entry["step"])] = entry
+
+        self.file = open(path, "a" if resume else "w")
+
+    def enabled(self):
+        return self.file is not None
+
+    # The recorded entry of a step, if it was done with the same content
+    def get(self, problem, step, digest):
+        with self.lock:
+            self.seen[(problem, step)] = digest
+            entry = self.entries.get((problem, step))
+        if entry is None or entry["hash"] != digest:
+            return None
+        return entry
+
+    def record(self, problem, step, digest, value=None):
+        entry = {"problem": problem, "step": step, "hash": digest, "value": value}
+        with self.lock:
+            self.entries[(problem, step)] = entry
+            if self.file is not None:
+                self.file.write(json.dumps(entry) + "\n")
+                self.file.flush()
+
+    # Hash of every step of the problem seen in this run, for steps like
+    # commit that have to be redone as soon as anything else changed
+    def problem_digest(self, problem, exclude=()):
+        with self.lock:
+            steps = sorted((step, digest) for (name, step), digest in self.seen.items() if name == problem and step not in exclude)
+        return hashlib.sha256(json.dumps(steps).encode()).hexdigest()
+
+    # Wrap a step so it is skipped when already done with the same content.
+    # `digest` is called lazily, in the thread running the step. With
+    # keep_value the result of the step is recorded and returned when skipped.
+    def step(self, problem, step, digest, fn, keep_value=False):
+        if not self.enabled():
+            return fn
+
+        def run():
+            step_digest = digest()
+            entry = self.get(problem, step, step_digest)
+            if entry is not None:
+                return Ok(entry["value"])
+
+            ret = fn()
+            if ret.is_ok():
+                self.record(problem, step, step_digest, ret.unwrap() if keep_value else None)
+            return ret
+
+        return run
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -1,184 +1,89 @@
-from dotenv import load_dotenv
 import click
 import os
-from result import Result, Ok, Err
-import yaml
-import configparser
-
-from polygon_api_calls import *
-from domjudge_api_calls import export_contest
-
-def is_domjudge_problem(path):
-    # path should be a directory
-    if not os.path.isdir(path):
-        return False
-    
-    # there should be a domjudge-problem.ini and a problem.yaml file
-    if not os.path.exists(os.path.join(path, "domjudge-problem.ini")):
-        return False
-    
-    if not os.path.exists(os.path.join(path, "problem.yaml")):
-        return False
-    
-    return True
-
-def get_problem_id(api_key, api_secret, problem_name):
-    # Get all problems
-    problems = get_problems(api_key, api_secret)
-    if problems.is_err():
-        return problems
-
-    # Find the problem with the given name
-    for problem in problems.unwrap():
-        if problem["name"] == problem_name:
-            return Ok(problem["id"])
-    
-    return Err("Problem not found")
-
-def add_problem_from_dir(api_key, api_secret, path, name_prefix):
-    print("Adding problem from " + path)
-    # Check if the directory is a Domjudge problem
-    if not is_domjudge_problem(path):
-        return Err("Directory is not a Domjudge problem")
-    
-    # Read the problem.yaml file
-    problem_yaml_path = os.path.join(path, "problem.yaml")
-    with open(problem_yaml_path, "r") as f:
-        problem_yaml = yaml.load(f, Loader=yaml.FullLoader)
-
-    domjudge_ini_path = os.path.join(path, "domjudge-problem.ini")
-    config = configparser.ConfigParser()
-    with open(domjudge_ini_path) as stream:
-        config.read_string("[problem]\n" + stream.read())
-
-    # Get the problem name
-    problem_name = problem_yaml["name"]
-    # Replace all spaces with dashes
-    problem_name = problem_name.replace(" ", "-")
-    # Turn it to lowercase
-    problem_name = problem_name.lower()
-    if name_prefix is not None:
-        problem_name = name_prefix + problem_name
-    
-    ret = create_problem(api_key, api_secret, problem_name)
-    if ret.is_err() and not "already have" in ret.unwrap_err():
-        return ret
-
-    # Get the problem ID
-    problem_id = get_problem_id(api_key, api_secret, problem_name)
-    if problem_id.is_err():
-        return problem_id
-    
-    # Get the time limit. It is a float in seconds, wrapped in ''
-    time_limit = float(config["problem"]["timelimit"][1:-1])
-    # Convert it to milliseconds
-    time_limit = int(time_limit * 1000)
-
-    memory_limit = 2048 # 2 GB default
-
-    # The yaml might optionnaly have a limits field with a memory limit
-    if "limits" in problem_yaml:
-        memory_limit = problem_yaml["limits"]["memory"]
-
-    memory_limit = min(memory_limit, 1024)
-
-    ret = set_limits(api_key, api_secret, problem_id.unwrap(), time_limit, memory_limit)
-    if ret.is_err():
-        return ret
-
-    ret = add_statement_resource(api_key, api_secret, problem_id.unwrap(), os.path.join(path, "problem.pdf"))
-    if ret.is_err():
-        return ret
 
-    ret = add_statement(api_key, api_secret, problem_id.unwrap(), problem_yaml["name"], path)
-    if ret.is_err():
-        return ret
-
-    checker = "wcmp"
-
-    if "validator_flags" in problem_yaml:
-        flag = problem_yaml["validator_flags"].lower()
-        if "1e-6" in flag:
-            checker = "rcmp6"
-        if "1e-9" in flag:
-            checker = "rcmp9"
+# The commands import what they need when they run, so that --help and the
+# commands not touching Selenium, PyPDF2 or requests start without loading them
+
+# Options of the commands uploading to Polygon, passed on to UploadRun
+upload_options = [
+    click.option("--name_prefix", default=None, help="Prefix to add to all problem names"),
+    click.option("--pool-size", default=10, show_default=True, help="Number of pooled connections to Polygon"),
+    click.option("--timeout", default=300.0, show_default=True, help="Timeout in seconds for a single Polygon request"),
+    click.option("--retries", default=3, show_default=True, help="Retries on connection errors, throttling and 5xx responses"),
+    click.option("--no-keep-alive", is_flag=True, help="Open a new connection for every Polygon request"),
+    click.option("--test-workers", default=8, show_default=True, help="Number of tests uploaded concurrently per problem"),
+    click.option("--step-workers", default=4, show_default=True, help="Number of upload steps (limits, statement, checker, ...) run concurrently per problem"),
+    click.option("--problem-workers", default=4, show_default=True, help="Number of problems uploaded concurrently"),
+    click.option("--max-in-flight", default=16, show_default=True, help="Maximum number of concurrent Polygon requests"),
+    click.option("--problem-cache", default=None, help="File to cache the problem name to id index in between runs"),
+    click.option("--problem-cache-ttl", default=24 * 60 * 60, show_default=True, help="Seconds before the problem cache is refreshed"),
+    click.option("--sync", is_flag=True, help="Only upload what differs from the problems already on Polygon"),
+    click.option("--statement-cache", default="./statement_cache", show_default=True, help="Directory caching split statements, empty to disable"),
+    click.option("--rate", default=10.0, show_default=True, help="Initial Polygon request rate in requests per second"),
+    click.option("--max-rate", default=200.0, show_default=True, help="Highest request rate the limiter may reach"),
+    click.option("--target-latency", default=None, type=float, help="Slow down when a request takes longer than this many seconds"),
+    click.option("--wait-builds", is_flag=True, help="Wait for the package builds to finish and report their state"),
+    click.option("--build-timeout", default=30 * 60, show_default=True, help="Seconds to wait for package builds with --wait-builds"),
+    click.option("--profile", default=None, help="Write a JSONL trace of every API call to this file and print a summary"),
+    click.option("--journal", default="./upload_journal.jsonl", show_default=True, help="File recording every completed upload step, empty to disable"),
+    click.option("--resume", is_flag=True, help="Skip the steps recorded in the journal whose files did not change"),
+    click.option("--credentials", default=None, help="File with more Polygon API keys, one \"key secret\" pair per line, to spread the problems over"),
+    click.option("--key-max-in-flight", default=None, type=int, help="Maximum number of concurrent requests per API key when several keys are used"),
+]
+
+# Options of the commands exporting from DomJudge
+export_options = [
+    click.option("--contest_id", default=None, prompt=True, help="ID of the contest to import"),
+    click.option("--export-workers", default=1, show_default=True, help="Number of problems exported concurrently, each in its own session"),
+    click.option("--exporter", type=click.Choice(["http", "browser"]), default="http", show_default=True, help="Export over plain HTTP (falling back to the browser) or always with the browser"),
+    click.option("--extract", is_flag=True, help="Extract the problem zips into directories instead of keeping them as zips"),
+    click.option("--blob-store", default=None, help="Store file contents once in this directory and build the problems from hardlinks"),
+    click.option("--api-cache", default="./domjudge_cache", show_default=True, help="Directory caching DomJudge API responses, empty to disable"),
+    click.option("--api-cache-ttl", default=60 * 60, show_default=True, help="Seconds before a cached DomJudge API response is revalidated"),
+    click.option("--offline", is_flag=True, help="Only use cached DomJudge API responses"),
+    click.option("--api-timeout", default=120.0, show_default=True, help="Timeout in seconds for a single DomJudge API request"),
+]
+
+def with_options(options):
+    def decorate(command):
+        for option in reversed(options):
+            command = option(command)
+        return command
+    return decorate
+
+def domjudge_login():
+    username = os.getenv("DOMJUDGE_USERNAME")
+    if username is None:
+        click.echo("No username provided")
+        return None
 
-    ret = set_checker(api_key, api_secret, problem_id.unwrap(), "std::" + checker + ".cpp")
-    if ret.is_err():
-        return ret
-    
+    password = os.getenv("DOMJUDGE_PASSWORD")
+    if password is None:
+        click.echo("No password provided")
+        return None
 
-    ret = add_file(api_key, api_secret, problem_id.unwrap(), "./empty_validator.cpp", "source")
-    if ret.is_err():
-        return ret
-    print("added validator")
-    
-    ret = set_validator(api_key, api_secret, problem_id.unwrap(), "empty_validator.cpp")
-    if ret.is_err():
-        return ret
-    
-    ret = add_main_sol(api_key, api_secret, problem_id.unwrap(), os.path.join(path, "main.cpp"))
-    if ret.is_err():
-        return ret
-    
-    # Add all the tests
-    samples_dir = os.path.join(path, "data", "sample")
-    tests_dir = os.path.join(path, "data", "secret")
-
-    cnt = 0
-    if os.path.exists(samples_dir):
-        for i, test in enumerate(os.listdir(samples_dir)):
-            # Ignore files that dont end with .in
-            if not test.endswith(".in"):
-                continue
-
-            cnt += 1
-            ret = add_test(api_key, api_secret, problem_id.unwrap(), os.path.join(samples_dir, test), True, cnt)
-            if ret.is_err():
-                return ret
-
-    if os.path.exists(tests_dir):
-        for i, test in enumerate(os.listdir(tests_dir)):
-            # Ignore files that dont end with .in
-            if not test.endswith(".in"):
-                continue
-
-            cnt += 1
-            ret = add_test(api_key, api_secret, problem_id.unwrap(), os.path.join(tests_dir, test), False, cnt)
-            if ret.is_err():
-                return ret
-    
-    ret = commit_changes(api_key, api_secret, problem_id.unwrap())
-    if ret.is_err():
-        return ret
-    
-    ret = build_package(api_key, api_secret, problem_id.unwrap())
-    if ret.is_err():
-        return ret
-    
-    return Ok("Problem added")
-    
-def add_contest_from_dir(api_key, api_secret, path, name_prefix):
-    # Get all problems in the directory
-    problems = [f for f in os.listdir(path) if os.path.isdir(os.path.join(path, f))]
-    
-    # For each problem, add it to Polygon
-    for problem in problems:
-        add_problem_from_dir(api_key, api_secret, os.path.join(path, problem), name_prefix)
-
-    return Ok("Contest added")
+    return username, password
 
 @click.command()
 @click.argument("path")
-@click.option("--name_prefix", default=None, help="Prefix to add to all problem names")
-def to_polygon(path, name_prefix):
-    api_key = os.getenv("POLYGON_API_KEY")
-    if api_key is None:
-        click.echo("No API key provided")
+@with_options(upload_options)
+@click.option("--max-memory", default=None, type=int, help="Refuse to start if uploading could need more than this many MB")
+@click.option("--scan-workers", default=8, show_default=True, help="Number of problems read and hashed concurrently before uploading")
+@click.option("--dry-run", is_flag=True, help="Only scan the problems and print what would be uploaded")
+def to_polygon(path, max_memory, scan_workers, dry_run, credentials, **upload):
+    import polygon_api_calls
+    from credentials import load_credentials
+    from preflight import is_domjudge_problem, find_problems, scan_tree
+    from upload import UploadRun, check_memory, add_problem_from_dir, add_contest_from_dir
+    from summary import print_scan_summary
+
+    credentials = load_credentials(credentials)
+    if credentials.is_err():
+        click.echo(credentials.unwrap_err())
         return
-    api_secret = os.getenv("POLYGON_API_SECRET")
-    if api_secret is None:
-        click.echo("No API secret provided")
+    credentials = credentials.unwrap()
+    if not credentials:
+        click.echo("No API key provided")
         return
 
     # The command should receive exactly one argument, a path
@@ -187,36 +92,117 @@ def to_polygon(path, name_prefix):
         click.echo("Path does not exist")
         return
 
+    polygon_api_calls.statement_cache_dir = upload["statement_cache"]
+
+    # Read and check every problem before sending anything
+    problems = scan_tree(find_problems(path), upload["name_prefix"], scan_workers)
+    if problems.is_err():
+        click.echo(problems.unwrap_err())
+        return
+    problems = problems.unwrap()
+
+    if dry_run:
+        print_scan_summary(problems)
+        return
+
+    ret = check_memory(problems.values(), max_memory, upload["max_in_flight"])
+    if ret.is_err():
+        click.echo(ret.unwrap_err())
+        return
+
+    run = UploadRun(credentials, **upload)
+
     if is_domjudge_problem(path):
-        ret = add_problem_from_dir(api_key, api_secret, path, name_prefix)
-        if ret.is_err():
-            click.echo(ret.unwrap_err())
+        api_key, api_secret, problem_index = run.assign(problems[path]["name"])
+        ret = add_problem_from_dir(api_key, api_secret, path, run.name_prefix, run.test_workers, problem_index, run.sync, run.builds, run.step_workers, run.journal, problems[path])
     else:
-        ret = add_contest_from_dir(api_key, api_secret, path, name_prefix)
-        if ret.is_err():
-            click.echo(ret.unwrap_err())
+        ret = add_contest_from_dir(run.api_key, run.api_secret, path, run.name_prefix, run.test_workers, run.problem_workers, run.problem_index, run.sync, run.builds, run.step_workers, run.journal, problems, run.credentials)
+    if ret.is_err():
+        click.echo(ret.unwrap_err())
+
+    run.close()
 
 @click.command()
-@click.option("--contest_id", default=None, prompt=True, help="ID of the contest to import")
-def import_domjudge_contest(contest_id):
-    username = os.getenv("DOMJUDGE_USERNAME")
-    if username is None:
-        click.echo("No username provided")
+@with_options(export_options)
+@click.option("--profile", default=None, help="Write a JSONL trace of every API call to this file and print a summary")
+def import_domjudge_contest(contest_id, export_workers, exporter, extract, blob_store, api_cache, api_cache_ttl, offline, api_timeout, profile):
+    from domjudge_api_calls import export_contest, configure_domjudge_client
+    from profiling import configure_tracer
+    from blob_store import BlobStore
+    from summary import print_export_summary, print_profile
+
+    login = domjudge_login()
+    if login is None:
         return
-    
-    password = os.getenv("DOMJUDGE_PASSWORD")
-    if password is None:
-        click.echo("No password provided")
+    username, password = login
+
+    if profile is not None:
+        configure_tracer(profile)
+
+    configure_domjudge_client(cache_dir=api_cache or None, ttl=api_cache_ttl, offline=offline, timeout=api_timeout)
+
+    if blob_store is not None:
+        blob_store = BlobStore(blob_store)
+
+    ret = export_contest(contest_id, username, password, export_workers, extract, blob_store, exporter)
+    if ret.is_err():
+        click.echo(ret.unwrap_err())
+    else:
+        print_export_summary(ret.unwrap())
+
+    if blob_store is not None:
+        click.echo(f"Blob store: {blob_store.stored_bytes / 2**20:.1f} MB stored, {blob_store.reused_bytes / 2**20:.1f} MB already present")
+
+    print_profile()
+
+@click.command()
+@with_options(export_options)
+@click.option("--queue-size", default=2, show_default=True, help="Number of exported problems that may wait for their upload")
+@with_options(upload_options)
+def domjudge_to_polygon(contest_id, export_workers, exporter, extract, blob_store, api_cache, api_cache_ttl, offline, api_timeout, queue_size, credentials, **upload):
+    from domjudge_api_calls import configure_domjudge_client
+    from blob_store import BlobStore
+    from credentials import load_credentials
+    from upload import UploadRun, import_contest_to_polygon
+
+    credentials = load_credentials(credentials)
+    if credentials.is_err():
+        click.echo(credentials.unwrap_err())
+        return
+    credentials = credentials.unwrap()
+    if not credentials:
+        click.echo("No API key provided")
+        return
+
+    login = domjudge_login()
+    if login is None:
         return
-    
-    export_contest(contest_id, username, password)
+    username, password = login
 
+    run = UploadRun(credentials, **upload)
+    configure_domjudge_client(cache_dir=api_cache or None, ttl=api_cache_ttl, offline=offline, timeout=api_timeout)
+
+    if blob_store is not None:
+        blob_store = BlobStore(blob_store)
+
+    ret = import_contest_to_polygon(
+        run.api_key, run.api_secret, contest_id, username, password, run.name_prefix,
+        export_workers, exporter, extract, blob_store, queue_size,
+        run.test_workers, run.problem_workers, run.problem_index, run.sync, run.builds, run.step_workers, run.journal, run.credentials,
+    )
+    if ret.is_err():
+        click.echo(ret.unwrap_err())
+
+    run.close()
+
+# Only runs when a command is invoked, not for a bare --help
 @click.group()
 def cli():
-    pass
+    from dotenv import load_dotenv
+    load_dotenv()
 
 if __name__ == "__main__":
-    load_dotenv()
     cli.add_command(to_polygon)
     cli.add_command(import_domjudge_contest)
-    cli()
\ No newline at end of file
+    cli.add_command(domjudge_to_polygon)
+    cli()
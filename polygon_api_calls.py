@@ -1,69 +1,363 @@
 import random
-import string
 import time
 import hashlib
 import requests
 import os
+import shutil
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from result import Ok, Err, Result
+from rate_limiter import AdaptiveRateLimiter
+from profiling import traced
 
-from PyPDF2 import PdfReader, PdfWriter
 from io import BytesIO
 
-def serialize_file(path):
-    with open(path, "r") as f:
-        return f.read()
-    
-def generate_apisig(methodName, api_secret, params):
-    first = "".join(random.choices(string.ascii_letters + string.digits, k=6))
-
-    encoded_params = []
-    for key, value in params.items():
-        if isinstance(value, bytes):
-            encoded_params.append((key.encode(), value))
+# Signature of a Polygon API request:
+# sha512(rand/methodName?key1=value1&key2=value2...#secret), params sorted by key.
+# The pieces are fed to the hash one by one and files are hashed in chunks,
+# so no signature string is ever built.
+def generate_apisig(methodName, api_secret, params, signature_random=None):
+    if signature_random is None:
+        signature_random = ''.join([chr(random.SystemRandom().randint(0, 25) + ord('a')) for _ in range(6)])
+    signature_random = convert_to_bytes(signature_random)
+
+    h = hashlib.sha512()
+    h.update(signature_random + b'/' + convert_to_bytes(methodName) + b'?')
+    for i, key in enumerate(sorted(params, key=convert_to_bytes)):
+        if i > 0:
+            h.update(b'&')
+        h.update(convert_to_bytes(key) + b'=')
+
+        value = params[key]
+        if isinstance(value, FileParam):
+            with value.open() as f:
+                for chunk in iter(lambda: f.read(MultipartBody.chunk_size), b""):
+                    h.update(chunk)
         else:
-            encoded_params.append((key.encode(), str(value).encode()))
-
-    sorted_params = sorted(encoded_params)
+            h.update(convert_to_bytes(value))
+    h.update(b'#' + convert_to_bytes(api_secret))
 
-    # print the key of the sorted params
-    tohash = (f"{first}/{methodName}?").encode()
-    for key, value in sorted_params:
-        tohash += key + b"=" + value + b"&"
-
-    tohash = tohash[:-1]
-    tohash += (f"#{api_secret}").encode()
-
-    return first + hashlib.sha512(tohash).hexdigest()
+    return signature_random + convert_to_bytes(h.hexdigest())
 
 def convert_to_bytes(x):
     if isinstance(x, bytes):
         return x
     return bytes(str(x), 'utf8')
 
-def send_request(methodName, api_key, api_secret, params):
-        print("sending " + methodName)
+# A file sent as a request parameter. Files are read as bytes, and only when
+# the request is sent, so nothing is decoded or kept around in between.
+class FileParam:
+    def __init__(self, path, size=None, opener=None, sha256=None):
+        self.path = path
+        self.size = size if size is not None else os.path.getsize(path)
+        self.opener = opener
+        # Known content hash (e.g. from a blob store manifest), saves rehashing
+        self.sha256 = sha256
+
+    def open(self):
+        if self.opener is not None:
+            return self.opener()
+        return open(self.path, "rb")
+
+    def read_bytes(self):
+        with self.open() as f:
+            return f.read()
+
+# Files can be given either as a path or as a FileParam (e.g. a zip member)
+def as_file_param(file):
+    if isinstance(file, FileParam):
+        return file
+    return FileParam(file)
+
+# Bytes held in memory while uploading a file of the given size:
+# both signing and sending read it in chunks
+def upload_memory(size):
+    return min(size, MultipartBody.chunk_size)
+
+# multipart/form-data request body that streams FileParam contents in chunks
+# instead of building the whole body in memory. It is seekable so that urllib3
+# can rewind it when retrying a request.
+class MultipartBody:
+    chunk_size = 1 << 16
+
+    def __init__(self, params):
+        self.boundary = os.urandom(16).hex()
+        self.content_type = "multipart/form-data; boundary=" + self.boundary
+
+        # Every parameter is sent as a file part, like requests does for files=params
+        self.segments = []
+        for key, value in params.items():
+            header = f'--{self.boundary}\r\nContent-Disposition: form-data; name="{key}"; filename="{key}"\r\n\r\n'
+            self.segments.append(header.encode())
+            self.segments.append(value if isinstance(value, FileParam) else convert_to_bytes(value))
+            self.segments.append(b"\r\n")
+        self.segments.append(f"--{self.boundary}--\r\n".encode())
+
+        self.length = sum(self._segment_length(segment) for segment in self.segments)
+        self.index = 0
+        self.offset = 0
+        self.position = 0
+        self.file = None
+
+    @staticmethod
+    def _segment_length(segment):
+        if isinstance(segment, FileParam):
+            return segment.size
+        return len(segment)
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self.chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def _close_file(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.length - self.position
+
+        chunks = []
+        while size > 0 and self.index < len(self.segments):
+            segment = self.segments[self.index]
+            remaining = self._segment_length(segment) - self.offset
+
+            if remaining <= 0:
+                self._close_file()
+                self.index += 1
+                self.offset = 0
+                continue
+
+            if isinstance(segment, FileParam):
+                if self.file is None:
+                    self.file = segment.open()
+                    if self.offset:
+                        self.file.seek(self.offset)
+                data = self.file.read(min(size, remaining))
+                if not data:
+                    raise IOError(f"{segment.path} changed while it was being uploaded")
+            else:
+                data = segment[self.offset:self.offset + min(size, remaining)]
+
+            chunks.append(data)
+            self.offset += len(data)
+            self.position += len(data)
+            size -= len(data)
+
+        return b"".join(chunks)
+
+    def tell(self):
+        return self.position
+
+    def seek(self, position, whence=0):
+        if whence == 1:
+            position += self.position
+        elif whence == 2:
+            position += self.length
+
+        self._close_file()
+        self.index = 0
+        self.offset = position
+        self.position = position
+        # Find the segment that contains the position
+        while self.index < len(self.segments) and self.offset >= self._segment_length(self.segments[self.index]):
+            self.offset -= self._segment_length(self.segments[self.index])
+            self.index += 1
+
+        return self.position
+
+    def close(self):
+        self._close_file()
+
+polygon_url = os.getenv("POLYGON_API_URL", "https://polygon.codeforces.com/api/")
+
+# Counts the requests sent on behalf of one unit of work (e.g. one problem)
+class RequestStats:
+    def __init__(self):
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def add(self):
+        with self.lock:
+            self.count += 1
+
+request_stats = contextvars.ContextVar("request_stats", default=None)
+
+# Like executor.submit, but the task runs in a copy of the caller's context,
+# so request_stats keeps counting inside worker threads
+def submit_in_context(executor, fn, *args):
+    return executor.submit(contextvars.copy_context().run, fn, *args)
+
+# Responses that mean Polygon wants us to slow down. They are retried
+# instead of failing the call. Only error bodies are checked for the markers:
+# a 200 body can be a file or statement that happens to contain them.
+throttle_markers = ("too many requests", "rate limit", "try again later")
+
+def is_throttled(result):
+    if result.status_code == 429 or result.status_code >= 500:
+        return True
+    if result.status_code == 200:
+        return False
+    return any(marker in result.text.lower() for marker in throttle_markers)
+
+class PolygonClient:
+    # Shared HTTP client for the Polygon API. Keeps a pool of keep-alive
+    # connections so consecutive calls reuse the same TLS session, and sends
+    # through an adaptive rate limiter shared by every caller.
+    def __init__(self, pool_size=10, timeout=(10, 300), retries=3, backoff_factor=0.5, keep_alive=True, max_in_flight=None, rate_limiter=None):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        # Caps the number of concurrent requests across every caller of the client
+        self.in_flight = threading.BoundedSemaphore(max_in_flight or pool_size)
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        self.session = requests.Session()
+
+        # Retry on connection resets, backing off between attempts.
+        # Error responses are retried by send, so the rate limiter sees them.
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=0,
+            backoff_factor=backoff_factor,
+            allowed_methods=None,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry, pool_block=True)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        if not keep_alive:
+            self.session.headers["Connection"] = "close"
+
+    def _backoff(self, attempt, result):
+        retry_after = result.headers.get("Retry-After")
+        if retry_after is not None and retry_after.isdigit():
+            return int(retry_after)
+        return self.backoff_factor * (2 ** attempt) * (1 + random.random())
+
+    def _post(self, methodName, api_key, api_secret, params, stream=False):
+        # Sign every attempt again, so retried calls carry a fresh time
+        params = dict(params)
         params["apiKey"] = api_key
         params["time"] = int(time.time())
-        
-        signature_random = ''.join([chr(random.SystemRandom().randint(0, 25) + ord('a')) for _ in range(6)])
-        signature_random = convert_to_bytes(signature_random)
-        for i in params:
-            params[i] = convert_to_bytes(params[i])
-        param_list = [(convert_to_bytes(key), params[key]) for key in params]
-        param_list.sort()
-        signature_string = signature_random + b'/' + convert_to_bytes(methodName)
-        signature_string += b'?' + b'&'.join([i[0] + b'=' + i[1] for i in param_list])
-        signature_string += b'#' + convert_to_bytes(api_secret)
-        params["apiSig"] = signature_random + convert_to_bytes(hashlib.sha512(signature_string).hexdigest())
-        url =  'https://polygon.codeforces.com/api/' + methodName
-        result = requests.post(url, files=params)
+        params["apiSig"] = generate_apisig(methodName, api_secret, params)
+        url = polygon_url + methodName
+        body = MultipartBody(params)
+
+        stats = request_stats.get()
+        if stats is not None:
+            stats.add()
+
+        try:
+            with self.in_flight:
+                self.rate_limiter.acquire()
+                start = time.monotonic()
+                result = self.session.post(url, data=body, headers={"Content-Type": body.content_type}, timeout=self.timeout, stream=stream)
+                return result, time.monotonic() - start, len(body)
+        finally:
+            body.close()
+
+    # With raw=True the response body is returned as bytes instead of parsed JSON
+    # (problem.viewFile, problem.viewSolution, ...). With a sink, a successful
+    # response body is passed to it chunk by chunk instead of being kept in
+    # memory, and the number of bytes received is returned.
+    def send(self, methodName, api_key, api_secret, params, raw=False, sink=None):
+        print("sending " + methodName)
+
+        with traced("polygon", methodName) as trace:
+            trace["bytes_sent"] = 0
+            for attempt in range(self.retries + 1):
+                trace["retries"] = attempt
+                try:
+                    result, latency, sent = self._post(methodName, api_key, api_secret, params, stream=sink is not None)
+                except (requests.RequestException, OSError) as e:
+                    trace["status"] = "error"
+                    self.rate_limiter.on_throttle()
+                    return Err(f"{methodName} failed: {e}")
+
+                trace["bytes_sent"] += sent
+                if sink is None or result.status_code != 200:
+                    trace["bytes_received"] = len(result.content)
+                trace["status"] = result.status_code
+
+                if not is_throttled(result):
+                    self.rate_limiter.on_success(latency)
+                    break
+
+                self.rate_limiter.on_throttle()
+                if attempt < self.retries:
+                    time.sleep(self._backoff(attempt, result))
+
+            if sink is not None and result.status_code == 200:
+                trace["bytes_received"] = 0
+                try:
+                    for chunk in result.iter_content(MultipartBody.chunk_size):
+                        sink(chunk)
+                        trace["bytes_received"] += len(chunk)
+                except (requests.RequestException, OSError) as e:
+                    trace["status"] = "error"
+                    return Err(f"{methodName} failed: {e}")
+                finally:
+                    result.close()
 
         print ("done with " + methodName)
+        if sink is not None and result.status_code == 200:
+            return Ok(trace["bytes_received"])
         if result.status_code == 200:
+            if raw:
+                return Ok(result.content)
             return Ok(result.json())
         else:
             return Err(result.text)
 
+    def close(self):
+        self.session.close()
+
+_client = None
+# Clients dedicated to one API key, with their own connections, concurrency
+# cap and rate limiter. Other keys use the default client.
+_key_clients = {}
+_client_lock = threading.Lock()
+
+def configure_client(**kwargs):
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = PolygonClient(**kwargs)
+        return _client
+
+def configure_key_client(api_key, **kwargs):
+    with _client_lock:
+        if api_key in _key_clients:
+            _key_clients[api_key].close()
+        _key_clients[api_key] = PolygonClient(**kwargs)
+        return _key_clients[api_key]
+
+def get_client(api_key=None):
+    global _client
+    with _client_lock:
+        if api_key in _key_clients:
+            return _key_clients[api_key]
+        if _client is None:
+            _client = PolygonClient()
+        return _client
+
+def send_request(methodName, api_key, api_secret, params, raw=False, sink=None):
+    return get_client(api_key).send(methodName, api_key, api_secret, params, raw, sink)
+
 def create_problem(api_key, api_secret, name):
     params = {
         "name": name,
@@ -100,7 +394,7 @@ def set_checker(api_key, api_secret, problem_id, checker_name):
 
 def add_main_sol(api_key, api_secret, problem_id, sol_path):
     params = {
-        "file": serialize_file(sol_path),
+        "file": as_file_param(sol_path),
         "name": "main.cpp",
         "problemId": problem_id,
         "tag": "MA",
@@ -112,73 +406,184 @@ def add_test(api_key, api_secret, problem_id, test_path, sample, test_idx):
     params = {
         "problemId": problem_id,
         "testIndex": test_idx,
-        "testInput": serialize_file(test_path),
+        "testInput": as_file_param(test_path),
         "testset": 'tests',
         "testUseInStatements": ('true' if sample else 'false'),
     }
 
     return send_request("problem.saveTest", api_key, api_secret, params)
 
+# tests is a list of (test_idx, test_path, sample) triples. on_success is
+# called with the triple of every test that was uploaded.
+def add_tests(api_key, api_secret, problem_id, tests, workers=1, on_success=None):
+    def upload(test_idx, test_path, sample):
+        ret = add_test(api_key, api_secret, problem_id, test_path, sample, test_idx)
+        if ret.is_ok() and on_success is not None:
+            on_success(test_idx, test_path, sample)
+        return ret
+
+    failures = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {
+            submit_in_context(executor, upload, test_idx, test_path, sample): (test_idx, as_file_param(test_path).path)
+            for test_idx, test_path, sample in tests
+        }
+        for future in as_completed(futures):
+            test_idx, test_path = futures[future]
+            try:
+                ret = future.result()
+            except Exception as e:
+                ret = Err(str(e))
+            if ret.is_err():
+                failures.append((test_idx, test_path, ret.unwrap_err()))
+
+    if failures:
+        failures.sort()
+        message = f"{len(failures)} of {len(tests)} tests failed to upload:"
+        for test_idx, test_path, error in failures:
+            message += f"\n  test {test_idx} ({test_path}): {error}"
+        return Err(message)
+
+    return Ok(len(tests))
+
 def add_file(api_key, api_secret, problem_id, file_path, typ):
+    file = as_file_param(file_path)
     params = {
-        "file": serialize_file(file_path),
-        "name": file_path.split("/")[-1],
+        "file": file,
+        "name": file.path.split("/")[-1],
         "problemId": problem_id,
         "type": typ,
     }
 
     return send_request("problem.saveFile", api_key, api_secret, params)
 
-def add_statement_resource(api_key, api_secret, problem_id, statement_path):
-    # Embed the pdf as a sequence of bytes
-    # Read the pdf
-    reader = PdfReader(statement_path)
-
-    # Split it into one page pdfs -> problem1.pdf, problem2.pdf, ...
-    for i, page in enumerate(reader.pages):
-        writer = PdfWriter()
-        writer.add_page(page)
-
-        # Write the page at statemetn_path + i
-        # Take the statement_path and remove the .pdf extension
-        writer.write(open(statement_path[:-4] + str(i) + ".pdf", "wb"))
-
+statement_cache_dir = "./statement_cache"
+_statement_cache = {}
+_statement_cache_lock = threading.Lock()
+
+def _read_cached_pages(cache_path):
+    pages = []
+    while os.path.exists(os.path.join(cache_path, f"problem{len(pages)}.pdf")):
+        with open(os.path.join(cache_path, f"problem{len(pages)}.pdf"), "rb") as f:
+            pages.append(f.read())
+    return pages
+
+def _write_cached_pages(cache_path, pages):
+    # Write to a temporary directory first so a cache entry is either complete or missing
+    tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    os.makedirs(tmp_path, exist_ok=True)
+    for i, page in enumerate(pages):
+        with open(os.path.join(tmp_path, f"problem{i}.pdf"), "wb") as f:
+            f.write(page)
+    try:
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        # Another run cached the same statement in the meantime
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+def _cached_pages(digest):
+    with _statement_cache_lock:
+        if digest in _statement_cache:
+            return _statement_cache[digest]
+
+    if statement_cache_dir and os.path.isdir(os.path.join(statement_cache_dir, digest)):
+        pages = _read_cached_pages(os.path.join(statement_cache_dir, digest))
+        with _statement_cache_lock:
+            _statement_cache[digest] = pages
+        return pages
+
+    return None
+
+# Split the statement into one page pdfs -> problem0.pdf, problem1.pdf, ...
+# and return their contents. Results are cached by the hash of the statement,
+# in memory and in statement_cache_dir.
+def split_statement(statement_path):
+    statement_file = as_file_param(statement_path)
+
+    # With a known hash a cached statement is not even read
+    if statement_file.sha256 is not None:
+        pages = _cached_pages(statement_file.sha256)
+        if pages is not None:
+            return pages
+
+    statement = statement_file.read_bytes()
+    digest = hashlib.sha256(statement).hexdigest()
+
+    pages = _cached_pages(digest)
+    if pages is not None:
+        return pages
+
+    cache_path = os.path.join(statement_cache_dir, digest) if statement_cache_dir else None
+
+    # Only needed on a cache miss, and slow to import
+    from PyPDF2 import PdfReader, PdfWriter
+
+    with traced("pdf", "split") as trace:
+        reader = PdfReader(BytesIO(statement))
+
+        pages = []
+        for page in reader.pages:
+            writer = PdfWriter()
+            writer.add_page(page)
+
+            buffer = BytesIO()
+            writer.write(buffer)
+            pages.append(buffer.getvalue())
+
+        trace["bytes_sent"] = len(statement)
+        trace["bytes_received"] = sum(len(page) for page in pages)
+
+    if cache_path is not None:
+        os.makedirs(statement_cache_dir, exist_ok=True)
+        _write_cached_pages(cache_path, pages)
+
+    with _statement_cache_lock:
+        _statement_cache[digest] = pages
+    return pages
+
+# Memory needed to split a statement of the given size
+def split_memory(size):
+    return 2 * size
+
+def add_statement_pages(api_key, api_secret, problem_id, pages):
     # Upload each pdf as a resource
-    for i in range(len(reader.pages)):
-        pdf_path = statement_path[:-4] + str(i) + ".pdf"
-
-        file_content = open(pdf_path, "rb").read()
-
+    for i, page in enumerate(pages):
         params = {
             "name": "problem" + str(i) + ".pdf",
             "problemId": problem_id,
-            "file": file_content,
+            "file": page,
         }
         
         ret = send_request("problem.saveStatementResource", api_key, api_secret, params)
-        # print the sent request for debugging
         if ret.is_err():
             return ret
         
     return Ok(None)
 
-def add_statement(api_key, api_secret, problem_id, problem_name, problem_path):
-    # Find number of "problemx.pdf" files
-    pdfs = [f for f in os.listdir(problem_path) if f.endswith(".pdf")]
-    # Remove the problem.pdf file
-    pdfs.remove("problem.pdf")
+# Returns the number of pages uploaded
+def add_statement_resource(api_key, api_secret, problem_id, statement_path):
+    # Embed the pdf as a sequence of bytes
+    pages = split_statement(statement_path)
+
+    ret = add_statement_pages(api_key, api_secret, problem_id, pages)
+    if ret.is_err():
+        return ret
 
+    return Ok(len(pages))
+
+def statement_legend(page_count):
     # Add each pdf as a resource
     resources = ""
-    for i in range(len(pdfs)):
+    for i in range(page_count):
         resources += f"\\includegraphics{{problem{i}.pdf}}\n"
 
-    legend = "\\begin{center}\n" + resources + "\\end{center}\n"
+    return "\\begin{center}\n" + resources + "\\end{center}\n"
 
+def add_statement(api_key, api_secret, problem_id, problem_name, page_count):
     params = {
         "lang": "english",
         "name": problem_name,
-        "legend": legend,
+        "legend": statement_legend(page_count),
         "problemId": problem_id,
     }
 
@@ -209,4 +614,111 @@ def build_package(api_key, api_secret, problem_id):
         "verify": "true",
     }
 
-    return send_request("problem.buildPackage", api_key, api_secret, params)
\ No newline at end of file
+    return send_request("problem.buildPackage", api_key, api_secret, params)
+
+def list_packages(api_key, api_secret, problem_id):
+    params = {
+        "problemId": problem_id,
+    }
+
+    result = send_request("problem.packages", api_key, api_secret, params)
+    if result.is_err():
+        return result
+
+    return Ok(result.unwrap()["result"])
+
+def get_problem_info(api_key, api_secret, problem_id):
+    params = {
+        "problemId": problem_id,
+    }
+
+    result = send_request("problem.info", api_key, api_secret, params)
+    if result.is_err():
+        return result
+
+    return Ok(result.unwrap()["result"])
+
+def get_checker(api_key, api_secret, problem_id):
+    params = {
+        "problemId": problem_id,
+    }
+
+    result = send_request("problem.checker", api_key, api_secret, params)
+    if result.is_err():
+        return result
+
+    return Ok(result.unwrap()["result"])
+
+def get_validator(api_key, api_secret, problem_id):
+    params = {
+        "problemId": problem_id,
+    }
+
+    result = send_request("problem.validator", api_key, api_secret, params)
+    if result.is_err():
+        return result
+
+    return Ok(result.unwrap()["result"])
+
+def get_statements(api_key, api_secret, problem_id):
+    params = {
+        "problemId": problem_id,
+    }
+
+    result = send_request("problem.statements", api_key, api_secret, params)
+    if result.is_err():
+        return result
+
+    return Ok(result.unwrap()["result"])
+
+def list_statement_resources(api_key, api_secret, problem_id):
+    params = {
+        "problemId": problem_id,
+    }
+
+    result = send_request("problem.statementResources", api_key, api_secret, params)
+    if result.is_err():
+        return result
+
+    return Ok(result.unwrap()["result"])
+
+# The inputs are left out, they can be large. Fetch them with view_test_input.
+def list_tests(api_key, api_secret, problem_id):
+    params = {
+        "noInputs": "true",
+        "problemId": problem_id,
+        "testset": "tests",
+    }
+
+    result = send_request("problem.tests", api_key, api_secret, params)
+    if result.is_err():
+        return result
+
+    return Ok(result.unwrap()["result"])
+
+# Streams the input of a test to sink, chunk by chunk
+def view_test_input(api_key, api_secret, problem_id, test_idx, sink):
+    params = {
+        "problemId": problem_id,
+        "testIndex": test_idx,
+        "testset": "tests",
+    }
+
+    return send_request("problem.testInput", api_key, api_secret, params, sink=sink)
+
+def view_file(api_key, api_secret, problem_id, typ, name):
+    params = {
+        "name": name,
+        "problemId": problem_id,
+        "type": typ,
+    }
+
+    return send_request("problem.viewFile", api_key, api_secret, params, raw=True)
+
+def view_solution(api_key, api_secret, problem_id, name):
+    params = {
+        "name": name,
+        "problemId": problem_id,
+    }
+
+    return send_request("problem.viewSolution", api_key, api_secret, params, raw=True)
@@ -0,0 +1,177 @@
+import os
+import time
+import yaml
+import configparser
+from concurrent.futures import ThreadPoolExecutor
+from result import Ok, Err, Result
+
+from polygon_api_calls import split_statement
+from problem_source import open_source
+from sync import file_hash
+
+def is_domjudge_problem(path):
+    # path should be a directory or a zip
+    source = open_source(path)
+    if source is None:
+        return False
+    
+    # there should be a domjudge-problem.ini and a problem.yaml file
+    if not source.exists("domjudge-problem.ini"):
+        return False
+    
+    if not source.exists("problem.yaml"):
+        return False
+    
+    return True
+
+# Whether path has any of the DomJudge problem files. Such an entry is scanned
+# and fails the upload when broken, anything else is not a problem at all.
+def looks_like_problem(path):
+    source = open_source(path)
+    if source is None:
+        return False
+
+    return source.exists("domjudge-problem.ini") or source.exists("problem.yaml")
+
+# The problem directories and zips under path, or path itself if it is a problem
+def find_problems(path):
+    if is_domjudge_problem(path):
+        return [path]
+
+    problems = []
+    for f in sorted(os.listdir(path)):
+        if looks_like_problem(os.path.join(path, f)):
+            problems.append(os.path.join(path, f))
+        elif open_source(os.path.join(path, f)) is not None:
+            print(f"Skipping {f}: not a DomJudge problem")
+    return problems
+
+# Samples first, then secret tests, each in sorted order.
+# Returns (test_idx, test_file, sample) triples with indices starting at 1
+def get_tests(source):
+    tests = []
+    for sub, sample in (("sample", True), ("secret", False)):
+        tests_dir = "data/" + sub
+
+        for test in sorted(source.list_dir(tests_dir)):
+            # Ignore files that dont end with .in
+            if not test.endswith(".in"):
+                continue
+
+            tests.append((len(tests) + 1, source.file_param(tests_dir + "/" + test), sample))
+
+    return tests
+
+def load_problem(path, name_prefix):
+    source = open_source(path)
+
+    # Read the problem.yaml file
+    problem_yaml = yaml.load(source.read_text("problem.yaml"), Loader=yaml.FullLoader)
+
+    config = configparser.ConfigParser()
+    config.read_string("[problem]\n" + source.read_text("domjudge-problem.ini"))
+
+    # Get the problem name
+    problem_name = problem_yaml["name"]
+    # Replace all spaces with dashes
+    problem_name = problem_name.replace(" ", "-")
+    # Turn it to lowercase
+    problem_name = problem_name.lower()
+    if name_prefix is not None:
+        problem_name = name_prefix + problem_name
+
+    # Get the time limit. It is a float in seconds, usually wrapped in ''
+    time_limit = float(config["problem"]["timelimit"].strip().strip("'\""))
+    # Convert it to milliseconds
+    time_limit = int(time_limit * 1000)
+
+    memory_limit = 2048 # 2 GB default
+
+    # The yaml might optionnaly have a limits field with a memory limit
+    if "limits" in problem_yaml:
+        memory_limit = problem_yaml["limits"]["memory"]
+
+    memory_limit = min(memory_limit, 1024)
+
+    checker = "wcmp"
+
+    if "validator_flags" in problem_yaml:
+        flag = problem_yaml["validator_flags"].lower()
+        if "1e-6" in flag:
+            checker = "rcmp6"
+        if "1e-9" in flag:
+            checker = "rcmp9"
+
+    return {
+        "path": path,
+        "name": problem_name,
+        "title": problem_yaml["name"],
+        "time_limit": time_limit,
+        "memory_limit": memory_limit,
+        "checker": "std::" + checker + ".cpp",
+        "statement": source.file_param("problem.pdf") if source.exists("problem.pdf") else None,
+        "validator": "./empty_validator.cpp",
+        "solution": source.file_param("main.cpp") if source.exists("main.cpp") else None,
+        "tests": get_tests(source),
+    }
+
+# Load and check one problem: parse its metadata, list its tests and split
+# its statement, which also warms the statement cache for the upload
+def scan_problem(path, name_prefix):
+    if not is_domjudge_problem(path):
+        return Err(f"{path}: not a Domjudge problem")
+
+    try:
+        problem = load_problem(path, name_prefix)
+    except KeyError as e:
+        return Err(f"{path}: missing {e} in problem.yaml or domjudge-problem.ini")
+    except Exception as e:
+        return Err(f"{path}: {e}")
+
+    if problem["statement"] is None:
+        return Err(f"{path}: problem.pdf not found")
+    if problem["solution"] is None:
+        return Err(f"{path}: main.cpp not found")
+
+    try:
+        problem["page_count"] = len(split_statement(problem["statement"]))
+    except Exception as e:
+        return Err(f"{path}: could not read problem.pdf: {e}")
+
+    return Ok(problem)
+
+def problem_files(problem):
+    return [problem["statement"], problem["solution"]] + [test for _, test, _ in problem["tests"]]
+
+# Scan every problem in parallel before anything is sent to Polygon, then hash
+# all their files so later steps (journal, sync) never read them just to hash.
+# Returns {path: problem}, or every problem that could not be read.
+def scan_tree(paths, name_prefix, workers=8):
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        results = dict(zip(paths, executor.map(lambda path: scan_problem(path, name_prefix), paths)))
+
+        errors = [ret.unwrap_err() for ret in results.values() if ret.is_err()]
+        if errors:
+            return Err(f"{len(errors)} of {len(paths)} problems are invalid:\n  " + "\n  ".join(errors))
+        problems = {path: ret.unwrap() for path, ret in results.items()}
+
+        names = {}
+        for path, problem in problems.items():
+            names.setdefault(problem["name"], []).append(path)
+        duplicates = [f"{name}: {', '.join(dups)}" for name, dups in names.items() if len(dups) > 1]
+        if duplicates:
+            return Err("Several problems would get the same Polygon name:\n  " + "\n  ".join(duplicates))
+
+        files = [f for problem in problems.values() for f in problem_files(problem) if f.sha256 is None]
+
+        def hash_file(f):
+            f.sha256 = file_hash(f)
+
+        list(executor.map(hash_file, files))
+
+    size = sum(f.size for problem in problems.values() for f in problem_files(problem))
+    tests = sum(len(problem["tests"]) for problem in problems.values())
+    print(f"Scanned {len(problems)} problems, {tests} tests, {size / 2**20:.1f} MB in {time.monotonic() - start:.1f}s")
+
+    return Ok(problems)
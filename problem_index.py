@@ -0,0 +1,119 @@
+import json
+import os
+import threading
+import time
+from result import Ok, Err, Result
+
+from polygon_api_calls import get_problems
+
+# Maps problem names to Polygon problem ids. problems.list is fetched at most
+# once per run (or not at all when a fresh on-disk cache exists) and the index
+# is kept up to date from the problem.create responses.
+class ProblemIndex:
+    def __init__(self, api_key, api_secret, cache_path=None, max_age=24 * 60 * 60):
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.cache_path = cache_path
+        self.max_age = max_age
+        self.ids = None
+        self.created = {}
+        self.lock = threading.Lock()
+
+    def _read_cache(self):
+        if self.cache_path is None or not os.path.exists(self.cache_path):
+            return None
+
+        try:
+            with open(self.cache_path, "r") as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        # The cache is only valid for the account it was built from, and only for a while
+        if cache.get("api_key") != self.api_key:
+            return None
+        if self.max_age is not None and time.time() - cache.get("saved_at", 0) > self.max_age:
+            return None
+
+        return cache.get("problems")
+
+    def _write_cache(self):
+        if self.cache_path is None:
+            return
+
+        cache = {
+            "api_key": self.api_key,
+            "saved_at": time.time(),
+            "problems": self.ids,
+        }
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def _fetch(self):
+        problems = get_problems(self.api_key, self.api_secret)
+        if problems.is_err():
+            return problems
+
+        ids = {}
+        for problem in problems.unwrap():
+            # Keep the first match, like the linear scan did
+            ids.setdefault(problem["name"], problem["id"])
+
+        self.ids = ids
+        self._write_cache()
+        return Ok(ids)
+
+    def _load(self):
+        if self.ids is not None:
+            return Ok(self.ids)
+
+        cached = self._read_cache()
+        if cached is not None:
+            self.ids = cached
+            return Ok(self.ids)
+
+        return self._fetch()
+
+    def get(self, name):
+        with self.lock:
+            if name in self.created:
+                return Ok(self.created[name])
+
+            ret = self._load()
+            if ret.is_err():
+                return ret
+
+            if name in self.ids:
+                return Ok(self.ids[name])
+
+            # The cache may be stale, refresh it once before giving up
+            if self.cache_path is not None:
+                ret = self._fetch()
+                if ret.is_err():
+                    return ret
+                if name in self.ids:
+                    return Ok(self.ids[name])
+
+        return Err("Problem not found")
+
+    # Whether the problem is known, without refreshing a stale cache on a miss
+    def has(self, name):
+        with self.lock:
+            if name in self.created:
+                return True
+
+            ret = self._load()
+            return ret.is_ok() and name in self.ids
+
+    def add(self, name, problem_id):
+        with self.lock:
+            self.created[name] = problem_id
+
+            # Keep a valid on-disk cache in sync without downloading the full list
+            if self.ids is None:
+                self.ids = self._read_cache()
+            if self.ids is not None:
+                self.ids[name] = problem_id
+                self._write_cache()
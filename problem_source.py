@@ -0,0 +1,99 @@
+import os
+import zipfile
+
+from polygon_api_calls import FileParam
+from blob_store import read_manifest
+
+# Read access to the files of a DomJudge problem, whether it was extracted to
+# a directory or is still a zip. Paths are relative to the problem root and
+# use "/" as separator.
+class DirSource:
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(os.path.normpath(path))
+        # Problems exported to a blob store come with the hash of every file
+        self.manifest = read_manifest(path)
+
+    def _full_path(self, rel):
+        return os.path.join(self.path, *rel.split("/"))
+
+    def exists(self, rel):
+        return os.path.exists(self._full_path(rel))
+
+    def list_dir(self, rel):
+        if not os.path.isdir(self._full_path(rel)):
+            return []
+        return os.listdir(self._full_path(rel))
+
+    def read_bytes(self, rel):
+        with open(self._full_path(rel), "rb") as f:
+            return f.read()
+
+    def read_text(self, rel):
+        return self.read_bytes(rel).decode()
+
+    def file_param(self, rel):
+        stat = os.stat(self._full_path(rel))
+        file = FileParam(self._full_path(rel), stat.st_size)
+        # The manifest hash is only used while the file is still the linked
+        # blob: an edit replaces the file or at least changes its mtime
+        blob = self.manifest.get(rel)
+        if blob is not None and (blob["size"], blob.get("inode"), blob.get("mtime_ns")) == (stat.st_size, stat.st_ino, stat.st_mtime_ns):
+            file.sha256 = blob["sha256"]
+        return file
+
+class ZipSource:
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.splitext(os.path.basename(path))[0]
+
+        with zipfile.ZipFile(path, "r") as zip_ref:
+            infos = [info for info in zip_ref.infolist() if not info.is_dir()]
+
+        # Some zips wrap the problem in a top level directory
+        roots = [info.filename[:-len("problem.yaml")] for info in infos if info.filename.endswith("problem.yaml")]
+        self.root = min(roots, key=len) if roots else ""
+
+        self.members = {
+            info.filename[len(self.root):]: info
+            for info in infos
+            if info.filename.startswith(self.root)
+        }
+
+    def exists(self, rel):
+        return rel in self.members or any(name.startswith(rel + "/") for name in self.members)
+
+    def list_dir(self, rel):
+        prefix = rel + "/"
+        return sorted({
+            name[len(prefix):].split("/")[0]
+            for name in self.members
+            if name.startswith(prefix)
+        })
+
+    def open(self, rel):
+        # Every reader gets its own handle on the archive, so members can be
+        # read from several threads at once. The archive is closed together
+        # with the member.
+        zip_ref = zipfile.ZipFile(self.path, "r")
+        try:
+            return zip_ref.open(self.members[rel])
+        finally:
+            zip_ref.close()
+
+    def read_bytes(self, rel):
+        with self.open(rel) as f:
+            return f.read()
+
+    def read_text(self, rel):
+        return self.read_bytes(rel).decode()
+
+    def file_param(self, rel):
+        return FileParam(f"{self.path}:{rel}", self.members[rel].file_size, lambda: self.open(rel))
+
+def open_source(path):
+    if os.path.isdir(path):
+        return DirSource(path)
+    if os.path.isfile(path) and zipfile.is_zipfile(path):
+        return ZipSource(path)
+    return None
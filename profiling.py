@@ -0,0 +1,100 @@
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Records one event per HTTP call (and per PDF split) with its latency, the
+# bytes sent and received, retries and status. Events go to a JSONL file as
+# they happen and are summarized per method at the end of the run.
+class Tracer:
+    def __init__(self, path=None):
+        self.path = path
+        self.events = []
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.file = open(path, "w") if path is not None else None
+
+    def record(self, kind, method, latency, bytes_sent=0, bytes_received=0, retries=0, status=None):
+        event = {
+            "time": time.time(),
+            "kind": kind,
+            "method": method,
+            "latency": latency,
+            "bytes_sent": bytes_sent,
+            "bytes_received": bytes_received,
+            "retries": retries,
+            "status": status,
+        }
+
+        with self.lock:
+            self.events.append(event)
+            if self.file is not None:
+                self.file.write(json.dumps(event) + "\n")
+                self.file.flush()
+
+    def summary(self):
+        with self.lock:
+            events = list(self.events)
+
+        methods = {}
+        for event in events:
+            methods.setdefault((event["kind"], event["method"]), []).append(event)
+
+        name_width = max([len("Method")] + [len(f"{kind} {method}") for kind, method in methods])
+        lines = [
+            f"{'Method'.ljust(name_width)}  {'Calls':>6}  {'Total (s)':>9}  {'p50 (ms)':>9}  {'p95 (ms)':>9}  {'Sent (MB)':>9}  {'Recv (MB)':>9}  {'MB/s':>7}  {'Retries':>7}"
+        ]
+        for (kind, method), group in sorted(methods.items(), key=lambda item: -sum(e["latency"] for e in item[1])):
+            latencies = sorted(e["latency"] for e in group)
+            total = sum(latencies)
+            sent = sum(e["bytes_sent"] for e in group) / 2**20
+            received = sum(e["bytes_received"] for e in group) / 2**20
+            throughput = (sent + received) / total if total > 0 else 0
+            lines.append(
+                f"{f'{kind} {method}'.ljust(name_width)}  {len(group):6}  {total:9.2f}  "
+                f"{percentile(latencies, 50) * 1000:9.1f}  {percentile(latencies, 95) * 1000:9.1f}  "
+                f"{sent:9.2f}  {received:9.2f}  {throughput:7.2f}  {sum(e['retries'] for e in group):7}"
+            )
+
+        lines.append(f"Wall clock: {time.monotonic() - self.started:.1f}s, {len(events)} calls")
+        return "\n".join(lines)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+# Nearest-rank percentile of an already sorted list
+def percentile(values, p):
+    if not values:
+        return 0
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+_tracer = None
+
+def configure_tracer(path):
+    global _tracer
+    if _tracer is not None:
+        _tracer.close()
+    _tracer = Tracer(path)
+    return _tracer
+
+def get_tracer():
+    return _tracer
+
+# Record an event when tracing is enabled, do nothing otherwise
+def record(kind, method, latency, bytes_sent=0, bytes_received=0, retries=0, status=None):
+    if _tracer is not None:
+        _tracer.record(kind, method, latency, bytes_sent, bytes_received, retries, status)
+
+# Times the block and records it. The block can fill in the yielded dict
+# with bytes_sent, bytes_received, retries and status.
+@contextmanager
+def traced(kind, method):
+    info = {}
+    start = time.monotonic()
+    try:
+        yield info
+    finally:
+        record(kind, method, time.monotonic() - start, **info)
@@ -0,0 +1,73 @@
+import threading
+import time
+
+# Token bucket whose rate adapts with AIMD: every successful call raises the
+# rate a little (additive increase, about `increase` requests/s per second of
+# traffic) and a throttled or slow call cuts it (multiplicative decrease).
+# Decreases happen at most once per `cooldown` seconds, so a burst of errors
+# from requests that were already in flight only counts once.
+# Until the first decrease the limiter is in slow start: every successful
+# call raises the rate by `increase`, so it doubles about every second of
+# traffic and quickly finds the rate Polygon accepts.
+class AdaptiveRateLimiter:
+    def __init__(self, rate=10.0, min_rate=0.5, max_rate=200.0, increase=1.0, decrease=0.5, target_latency=None, cooldown=1.0):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.target_latency = target_latency
+        self.cooldown = cooldown
+
+        self.tokens = 1.0
+        self.last_refill = time.monotonic()
+        self.last_decrease = 0.0
+        self.slow_start = True
+        self.lock = threading.Lock()
+
+    def _burst(self):
+        # Allow up to one second worth of requests at once
+        return max(1.0, self.rate)
+
+    def _refill(self, now):
+        self.tokens = min(self._burst(), self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    # Block until a request may be sent
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                wait = (1.0 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+    def _decrease(self):
+        now = time.monotonic()
+        if now - self.last_decrease < self.cooldown:
+            return
+        self.last_decrease = now
+        self.slow_start = False
+        self._refill(now)
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+        self.tokens = min(self.tokens, self._burst())
+
+    def on_success(self, latency):
+        with self.lock:
+            if self.target_latency is not None and latency > self.target_latency:
+                self._decrease()
+                return
+
+            self._refill(time.monotonic())
+            if self.slow_start:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+            else:
+                self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+    def on_throttle(self):
+        with self.lock:
+            self._decrease()
@@ -0,0 +1,70 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from result import Ok, Err, Result
+
+from polygon_api_calls import submit_in_context
+
+# Runs the steps of a problem upload as a DAG: a step starts as soon as all the
+# steps it depends on succeeded, so independent API calls overlap. Every step
+# returns a Result, whose value is kept in `results` for the steps after it.
+# When a step fails the steps depending on it are skipped, the others still run.
+class StepScheduler:
+    def __init__(self, workers=4):
+        self.workers = workers
+        self.steps = {}
+        self.results = {}
+        self.errors = {}
+        self.skipped = []
+        self.durations = {}
+
+    def add(self, name, fn, deps=()):
+        for dep in deps:
+            if dep not in self.steps:
+                raise ValueError(f"Step {name} depends on unknown step {dep}")
+        self.steps[name] = (fn, tuple(deps))
+
+    def _run_step(self, name):
+        fn, _ = self.steps[name]
+        start = time.monotonic()
+        try:
+            ret = fn()
+        except Exception as e:
+            ret = Err(str(e))
+        self.durations[name] = time.monotonic() - start
+        return ret
+
+    def run(self):
+        pending = dict(self.steps)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as executor:
+            while pending or running:
+                for name, (_, deps) in list(pending.items()):
+                    if any(dep in self.errors or dep in self.skipped for dep in deps):
+                        self.skipped.append(name)
+                        del pending[name]
+                    elif all(dep in self.results for dep in deps):
+                        running[submit_in_context(executor, self._run_step, name)] = name
+                        del pending[name]
+
+                # Skipping a step can make others skippable right away
+                if not running:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    ret = future.result()
+                    if ret.is_err():
+                        self.errors[name] = ret.unwrap_err()
+                    else:
+                        self.results[name] = ret.unwrap()
+
+        if self.errors:
+            # How long a step took before failing tells a timeout from a rejected call
+            message = "; ".join(f"{name}: {error} ({self.durations[name]:.1f}s)" for name, error in self.errors.items())
+            if self.skipped:
+                message += f" (skipped {', '.join(self.skipped)})"
+            return Err(message)
+
+        return Ok(self.results)
@@ -0,0 +1,79 @@
+import click
+
+from profiling import get_tracer
+
+def print_contest_summary(results):
+    name_width = max([len("Problem")] + [len(name) for name in results])
+    click.echo("")
+    click.echo(f"{'Problem'.ljust(name_width)}  {'Status':6}  {'Time (s)':>8}  {'Requests':>8}")
+    for name, (ret, elapsed, requests_sent) in results.items():
+        status = "OK" if ret.is_ok() else "FAILED"
+        click.echo(f"{name.ljust(name_width)}  {status:6}  {elapsed:8.1f}  {requests_sent:8}")
+
+    for name, (ret, _, _) in results.items():
+        if ret.is_err():
+            click.echo(f"{name}: {ret.unwrap_err()}")
+
+def print_export_summary(results):
+    name_width = max([len("Problem")] + [len(str(name)) for name in results])
+    click.echo("")
+    click.echo(f"{'Problem'.ljust(name_width)}  {'Status':6}  {'Time (s)':>8}")
+    for name, (ret, elapsed) in results.items():
+        status = "OK" if ret.is_ok() else "FAILED"
+        click.echo(f"{str(name).ljust(name_width)}  {status:6}  {elapsed:8.1f}")
+
+    for name, (ret, _) in results.items():
+        if ret.is_err():
+            click.echo(f"{name}: {ret.unwrap_err()}")
+
+def print_build_summary(results):
+    if not results:
+        return
+
+    name_width = max([len("Problem")] + [len(name) for name in results])
+    click.echo("")
+    click.echo(f"{'Problem'.ljust(name_width)}  {'Build':7}  {'Time (s)':>8}")
+    for name, build in results.items():
+        click.echo(f"{name.ljust(name_width)}  {build['state']:7}  {build['duration']:8.1f}")
+
+    for name, build in results.items():
+        if build["state"] != "READY" and build["comment"]:
+            click.echo(f"{name}: {build['comment']}")
+
+def print_scan_summary(problems):
+    rows = [
+        (
+            problem["name"],
+            f"{problem['time_limit']} ms",
+            f"{problem['memory_limit']} MB",
+            problem["checker"],
+            str(len(problem["tests"])),
+            str(problem["page_count"]),
+            f"{sum(test.size for _, test, _ in problem['tests']) / 2**20:.1f}",
+        )
+        for problem in problems.values()
+    ]
+    header = ("Problem", "Time", "Memory", "Checker", "Tests", "Pages", "Tests (MB)")
+    widths = [max(len(row[i]) for row in rows + [header]) for i in range(len(header))]
+
+    click.echo("")
+    for row in [header] + rows:
+        click.echo("  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip())
+
+def print_profile():
+    tracer = get_tracer()
+    if tracer is None:
+        return
+
+    click.echo("")
+    click.echo(tracer.summary())
+    tracer.close()
+
+def print_share_report(credentials):
+    if credentials is None:
+        return
+
+    report = credentials.share_report()
+    if report is not None:
+        click.echo("")
+        click.echo(report)
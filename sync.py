@@ -0,0 +1,174 @@
+import hashlib
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
+from result import Ok, Err, Result
+
+from polygon_api_calls import *
+from build_queue import request_build
+
+def content_hash(data):
+    if isinstance(data, str):
+        data = data.encode()
+    return hashlib.sha256(data).hexdigest()
+
+def file_hash(file):
+    file = as_file_param(file)
+    if file.sha256 is not None:
+        return file.sha256
+
+    # Plain files are memory-mapped, hashlib then reads them without copying
+    # and without holding the GIL
+    if file.opener is None and file.size > 0:
+        with open(file.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            return hashlib.sha256(m).hexdigest()
+
+    h = hashlib.sha256()
+    with file.open() as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+# sha256 of the input of a test on Polygon, streamed into the hash.
+# None when it can not be fetched, the test is then uploaded again.
+def remote_test_hash(api_key, api_secret, problem_id, test_idx):
+    h = hashlib.sha256()
+    ret = view_test_input(api_key, api_secret, problem_id, test_idx, h.update)
+    if ret.is_err():
+        return None
+    return h.hexdigest()
+
+# Fetch everything the sync compares against, concurrently
+def fetch_remote_state(api_key, api_secret, problem_id, problem):
+    validator_name = os.path.basename(problem["validator"])
+    calls = {
+        "info": (get_problem_info, ()),
+        "checker": (get_checker, ()),
+        "validator": (get_validator, ()),
+        "validator_file": (view_file, ("source", validator_name)),
+        "solution": (view_solution, ("main.cpp",)),
+        "statements": (get_statements, ()),
+        "statement_resources": (list_statement_resources, ()),
+        "tests": (list_tests, ()),
+    }
+
+    with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+        futures = {
+            key: submit_in_context(executor, fn, api_key, api_secret, problem_id, *args)
+            for key, (fn, args) in calls.items()
+        }
+        results = {key: future.result() for key, future in futures.items()}
+
+    # A missing file or solution just means it has to be uploaded
+    for key in ("validator_file", "solution"):
+        if results[key].is_err():
+            results[key] = Ok(None)
+
+    state = {}
+    for key, ret in results.items():
+        if ret.is_err():
+            return Err(f"Could not fetch {key}: {ret.unwrap_err()}")
+        state[key] = ret.unwrap()
+
+    return Ok(state)
+
+def sync_problem(api_key, api_secret, problem_id, problem, test_workers=1, builds=None):
+    remote = fetch_remote_state(api_key, api_secret, problem_id, problem)
+    if remote.is_err():
+        return remote
+    remote = remote.unwrap()
+
+    changed = []
+
+    if (remote["info"].get("timeLimit"), remote["info"].get("memoryLimit")) != (problem["time_limit"], problem["memory_limit"]):
+        ret = set_limits(api_key, api_secret, problem_id, problem["time_limit"], problem["memory_limit"])
+        if ret.is_err():
+            return ret
+        changed.append("limits")
+
+    # Polygon only reports the length of statement resources, so compare sizes
+    pages = split_statement(problem["statement"])
+    remote_resources = {f["name"]: f["length"] for f in remote["statement_resources"]}
+    if any(remote_resources.get(f"problem{i}.pdf") != len(page) for i, page in enumerate(pages)):
+        ret = add_statement_pages(api_key, api_secret, problem_id, pages)
+        if ret.is_err():
+            return ret
+        changed.append("statement resources")
+
+    statement = remote["statements"].get("english", {})
+    if statement.get("name") != problem["title"] or statement.get("legend") != statement_legend(len(pages)):
+        ret = add_statement(api_key, api_secret, problem_id, problem["title"], len(pages))
+        if ret.is_err():
+            return ret
+        changed.append("statement")
+
+    if remote["checker"] != problem["checker"]:
+        ret = set_checker(api_key, api_secret, problem_id, problem["checker"])
+        if ret.is_err():
+            return ret
+        changed.append("checker")
+
+    validator_name = os.path.basename(problem["validator"])
+    if remote["validator_file"] is None or content_hash(remote["validator_file"]) != file_hash(problem["validator"]):
+        ret = add_file(api_key, api_secret, problem_id, problem["validator"], "source")
+        if ret.is_err():
+            return ret
+        changed.append("validator file")
+
+    if remote["validator"] != validator_name:
+        ret = set_validator(api_key, api_secret, problem_id, validator_name)
+        if ret.is_err():
+            return ret
+        changed.append("validator")
+
+    if remote["solution"] is None or content_hash(remote["solution"]) != file_hash(problem["solution"]):
+        ret = add_main_sol(api_key, api_secret, problem_id, problem["solution"])
+        if ret.is_err():
+            return ret
+        changed.append("main solution")
+
+    # Inputs are only fetched for the tests that could be unchanged, one at a
+    # time per worker so at most test_workers chunks are in memory
+    remote_tests = {test["index"]: test for test in remote["tests"]}
+    candidates = [
+        test_idx for test_idx, _, sample in problem["tests"]
+        if test_idx in remote_tests and remote_tests[test_idx].get("useInStatements", False) == sample
+    ]
+    with ThreadPoolExecutor(max_workers=max(1, test_workers)) as executor:
+        futures = {
+            test_idx: submit_in_context(executor, remote_test_hash, api_key, api_secret, problem_id, test_idx)
+            for test_idx in candidates
+        }
+        remote_hashes = {test_idx: future.result() for test_idx, future in futures.items()}
+
+    tests = []
+    for test_idx, test_file, sample in problem["tests"]:
+        remote_hash = remote_hashes.get(test_idx)
+        if remote_hash is None or remote_hash != file_hash(test_file):
+            tests.append((test_idx, test_file, sample))
+
+    if tests:
+        ret = add_tests(api_key, api_secret, problem_id, tests, test_workers)
+        if ret.is_err():
+            return ret
+        changed.append(f"{len(tests)} tests")
+
+    # There is no API call to delete tests, so extra ones have to be removed by hand
+    extra_tests = sorted(idx for idx in remote_tests if idx > len(problem["tests"]))
+    if extra_tests:
+        print(f"Warning: {problem['name']} has {len(extra_tests)} tests on Polygon that are not in {problem['path']}")
+
+    if not changed:
+        return Ok("Problem up to date")
+
+    print(f"Updated {problem['name']}: {', '.join(changed)}")
+
+    ret = commit_changes(api_key, api_secret, problem_id)
+    if ret.is_err():
+        return ret
+
+    ret = request_build(api_key, api_secret, problem_id, problem["name"], builds)
+    if ret.is_err():
+        return ret
+
+    return Ok("Problem synced")
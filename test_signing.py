@@ -0,0 +1,40 @@
+import hashlib
+
+from polygon_api_calls import FileParam, MultipartBody, convert_to_bytes, generate_apisig
+
+# The signature as send_request computed it before signing was made
+# incremental: the whole signature string is built, then hashed
+def concatenated_apisig(methodName, api_secret, params, signature_random):
+    def param_bytes(value):
+        if isinstance(value, FileParam):
+            return value.read_bytes()
+        return convert_to_bytes(value)
+
+    signature_random = convert_to_bytes(signature_random)
+    param_list = [(convert_to_bytes(key), param_bytes(params[key])) for key in params]
+    param_list.sort()
+    signature_string = signature_random + b'/' + convert_to_bytes(methodName)
+    signature_string += b'?' + b'&'.join([i[0] + b'=' + i[1] for i in param_list])
+    signature_string += b'#' + convert_to_bytes(api_secret)
+    return signature_random + convert_to_bytes(hashlib.sha512(signature_string).hexdigest())
+
+def check(params):
+    expected = concatenated_apisig("problem.saveFile", "secret", params, "abcdef")
+    assert generate_apisig("problem.saveFile", "secret", params, "abcdef") == expected
+
+def test_empty_params():
+    check({})
+
+def test_non_ascii_values():
+    check({"problemId": "1", "name": "Задача — ½", "legend": b"\xc3\xa9t\xc3\xa9"})
+
+def test_int_values():
+    check({"problemId": 42, "timeLimit": 1000, "memoryLimit": 256, "testIndex": 10})
+
+def test_large_file(tmp_path):
+    path = tmp_path / "input.txt"
+    path.write_bytes(bytes(range(256)) * (3 * MultipartBody.chunk_size // 256 + 17))
+    file = FileParam(str(path))
+    assert file.size > MultipartBody.chunk_size
+
+    check({"problemId": 1, "type": "resource", "name": "input.txt", "file": file})
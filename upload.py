@@ -0,0 +1,335 @@
+import click
+import os
+from result import Result, Ok, Err
+import time
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+import polygon_api_calls
+from polygon_api_calls import *
+from problem_index import ProblemIndex
+from rate_limiter import AdaptiveRateLimiter
+from build_queue import BuildQueue, request_build
+from profiling import configure_tracer
+from summary import print_contest_summary, print_export_summary, print_build_summary, print_share_report, print_profile
+from sync import sync_problem, content_hash, file_hash
+from step_scheduler import StepScheduler
+from journal import Journal
+from credentials import CredentialPool
+from preflight import find_problems, scan_problem, scan_tree
+
+# Report the largest file to upload and check that uploading `concurrency`
+# of the largest files at once stays under max_memory (in MB)
+def check_memory(problems, max_memory, concurrency):
+    # (file, memory needed to upload it)
+    files = []
+    for problem in problems:
+        files.append((problem["statement"], split_memory))
+        files.append((problem["solution"], upload_memory))
+        files.extend((test, upload_memory) for _, test, _ in problem["tests"])
+
+    sizes = [(f.size, f.path, memory) for f, memory in files]
+    if not sizes:
+        return Ok(0)
+
+    largest_size, largest_file, _ = max(sizes, key=lambda size: size[:2])
+    click.echo(f"Largest file: {largest_file} ({largest_size / 2**20:.1f} MB)")
+
+    estimate = sum(sorted((memory(size) for size, _, memory in sizes), reverse=True)[:concurrency])
+    if max_memory is not None and estimate > max_memory * 2**20:
+        return Err(f"Uploading needs up to {estimate / 2**20:.1f} MB, more than --max-memory {max_memory} MB")
+
+    return Ok(estimate)
+
+def get_problem_id(api_key, api_secret, problem_name, problem_index=None):
+    if problem_index is None:
+        problem_index = ProblemIndex(api_key, api_secret)
+
+    return problem_index.get(problem_name)
+
+# Upload the tests that are not in the journal yet, and journal every test as
+# soon as it is uploaded
+def upload_tests(api_key, api_secret, problem_id, problem, test_workers, journal):
+    tests = problem["tests"]
+    if not journal.enabled():
+        return add_tests(api_key, api_secret, problem_id, tests, test_workers)
+
+    def test_hash(test):
+        _, test_file, sample = test
+        return content_hash(f"{sample}\n{file_hash(test_file)}")
+
+    with ThreadPoolExecutor(max_workers=max(1, test_workers)) as executor:
+        digests = dict(zip((test_idx for test_idx, _, _ in tests), executor.map(test_hash, tests)))
+
+    todo = [test for test in tests if journal.get(problem["name"], f"test {test[0]}", digests[test[0]]) is None]
+    if len(todo) < len(tests):
+        print(f"{problem['name']}: {len(tests) - len(todo)} tests already uploaded")
+
+    def on_success(test_idx, test_file, sample):
+        journal.record(problem["name"], f"test {test_idx}", digests[test_idx])
+
+    return add_tests(api_key, api_secret, problem_id, todo, test_workers, on_success)
+
+def add_problem_from_dir(api_key, api_secret, path, name_prefix, test_workers=1, problem_index=None, sync=False, builds=None, step_workers=1, journal=None, problem=None):
+    print("Adding problem from " + path)
+    # Problems come already scanned from to_polygon
+    if problem is None:
+        problem = scan_problem(path, name_prefix)
+        if problem.is_err():
+            return problem
+        problem = problem.unwrap()
+    problem_name = problem["name"]
+
+    if problem_index is None:
+        problem_index = ProblemIndex(api_key, api_secret)
+    if journal is None:
+        journal = Journal()
+
+    # The problem id is journaled per account
+    created = journal.get(problem_name, "create", content_hash(api_key))
+    if created is not None:
+        problem_id = Ok(created["value"])
+    else:
+        ret = create_problem(api_key, api_secret, problem_name)
+        if ret.is_err() and not "already have" in ret.unwrap_err():
+            return ret
+
+        if ret.is_ok():
+            problem_index.add(problem_name, ret.unwrap()["result"]["id"])
+
+        # Get the problem ID
+        problem_id = get_problem_id(api_key, api_secret, problem_name, problem_index)
+        if problem_id.is_err():
+            return problem_id
+        journal.record(problem_name, "create", content_hash(api_key), problem_id.unwrap())
+
+    # Only upload what differs from the current state on Polygon
+    if sync:
+        return sync_problem(api_key, api_secret, problem_id.unwrap(), problem, test_workers, builds)
+
+    # Independent calls overlap, commit and build wait for everything else.
+    # Steps already in the journal with the same content are skipped.
+    problem_id = problem_id.unwrap()
+    validator_name = os.path.basename(problem["validator"])
+
+    def step(name, digest, fn, deps=(), keep_value=False):
+        steps.add(name, journal.step(problem_name, name, digest, fn, keep_value), deps)
+
+    steps = StepScheduler(step_workers)
+    step(
+        "limits",
+        lambda: content_hash(f"{problem['time_limit']} {problem['memory_limit']}"),
+        lambda: set_limits(api_key, api_secret, problem_id, problem["time_limit"], problem["memory_limit"]),
+    )
+    step(
+        "statement resources",
+        lambda: file_hash(problem["statement"]),
+        lambda: add_statement_resource(api_key, api_secret, problem_id, problem["statement"]),
+    )
+    step(
+        "statement",
+        lambda: content_hash(f"{problem['title']}\n{file_hash(problem['statement'])}"),
+        lambda: add_statement(api_key, api_secret, problem_id, problem["title"], problem["page_count"]),
+    )
+    step(
+        "checker",
+        lambda: content_hash(problem["checker"]),
+        lambda: set_checker(api_key, api_secret, problem_id, problem["checker"]),
+    )
+    step(
+        "validator file",
+        lambda: file_hash(problem["validator"]),
+        lambda: add_file(api_key, api_secret, problem_id, problem["validator"], "source"),
+    )
+    step(
+        "validator",
+        lambda: content_hash(f"{validator_name}\n{file_hash(problem['validator'])}"),
+        lambda: set_validator(api_key, api_secret, problem_id, validator_name),
+        ["validator file"],
+    )
+    step(
+        "main solution",
+        lambda: file_hash(problem["solution"]),
+        lambda: add_main_sol(api_key, api_secret, problem_id, problem["solution"]),
+    )
+    steps.add("tests", lambda: upload_tests(api_key, api_secret, problem_id, problem, test_workers, journal))
+    # Commit and build again as soon as anything else was uploaded
+    step(
+        "commit",
+        lambda: journal.problem_digest(problem_name, ("commit", "build")),
+        lambda: commit_changes(api_key, api_secret, problem_id),
+        list(steps.steps),
+    )
+    step(
+        "build",
+        lambda: journal.problem_digest(problem_name, ("commit", "build")),
+        lambda: request_build(api_key, api_secret, problem_id, problem_name, builds),
+        ["commit"],
+    )
+
+    ret = steps.run()
+    if ret.is_err():
+        return ret
+
+    return Ok("Problem added")
+    
+def upload_problem(api_key, api_secret, path, name_prefix, test_workers, problem_index, sync, builds, step_workers, journal, problem, credentials=None):
+    # With several API keys the problem goes to the account that owns it
+    if credentials is not None:
+        api_key, api_secret, problem_index = credentials.assign(problem["name"])
+
+    stats = RequestStats()
+    request_stats.set(stats)
+
+    start = time.monotonic()
+    try:
+        ret = add_problem_from_dir(api_key, api_secret, path, name_prefix, test_workers, problem_index, sync, builds, step_workers, journal, problem)
+    except Exception as e:
+        ret = Err(str(e))
+
+    return ret, time.monotonic() - start, stats.count
+
+def add_contest_from_dir(api_key, api_secret, path, name_prefix, test_workers=1, problem_workers=1, problem_index=None, sync=False, builds=None, step_workers=1, journal=None, problems=None, credentials=None):
+    # One index shared by every problem, so problems.list is fetched at most once
+    if problem_index is None:
+        problem_index = ProblemIndex(api_key, api_secret)
+
+    # Scan all problems in the directory before uploading any
+    if problems is None:
+        problems = scan_tree(find_problems(path), name_prefix)
+        if problems.is_err():
+            return problems
+        problems = problems.unwrap()
+
+    # Upload several problems at once, each in its own context so requests are counted per problem
+    with ThreadPoolExecutor(max_workers=max(1, problem_workers)) as executor:
+        futures = {
+            os.path.basename(problem_path): submit_in_context(executor, upload_problem, api_key, api_secret, problem_path, name_prefix, test_workers, problem_index, sync, builds, step_workers, journal, problem, credentials)
+            for problem_path, problem in problems.items()
+        }
+        results = {problem: future.result() for problem, future in futures.items()}
+
+    print_contest_summary(results)
+
+    failed = [problem for problem, (ret, _, _) in results.items() if ret.is_err()]
+    if failed:
+        return Err(f"{len(failed)} of {len(problems)} problems failed: {', '.join(failed)}")
+
+    return Ok("Contest added")
+
+# Export a DomJudge contest and upload it at the same time: every problem is
+# queued for upload as soon as it is exported. The queue is bounded, so when
+# uploading falls behind the exporters wait instead of piling up problems.
+def import_contest_to_polygon(api_key, api_secret, contest_id, username, password, name_prefix, export_workers=1, exporter="http", extract=False, blob_store=None, queue_size=2, test_workers=1, problem_workers=1, problem_index=None, sync=False, builds=None, step_workers=1, journal=None, credentials=None):
+    from domjudge_api_calls import export_contest
+
+    if problem_index is None:
+        problem_index = ProblemIndex(api_key, api_secret)
+
+    exported = queue.Queue(maxsize=max(1, queue_size))
+    results = {}
+
+    def upload_exported():
+        while True:
+            item = exported.get()
+            if item is None:
+                return
+
+            problem_id, path = item
+            problem = scan_problem(path, name_prefix)
+            if problem.is_err():
+                results[str(problem_id)] = (problem, 0, 0)
+                continue
+
+            results[str(problem_id)] = upload_problem(api_key, api_secret, path, name_prefix, test_workers, problem_index, sync, builds, step_workers, journal, problem.unwrap(), credentials)
+
+    def on_exported(problem_id, ret):
+        if ret.is_ok():
+            exported.put((problem_id, ret.unwrap()))
+
+    with ThreadPoolExecutor(max_workers=max(1, problem_workers)) as executor:
+        uploaders = [executor.submit(upload_exported) for _ in range(max(1, problem_workers))]
+        try:
+            export_results = export_contest(contest_id, username, password, export_workers, extract, blob_store, exporter, on_exported)
+        finally:
+            for _ in uploaders:
+                exported.put(None)
+
+        for uploader in uploaders:
+            uploader.result()
+
+    if export_results.is_err():
+        return export_results
+
+    print_export_summary(export_results.unwrap())
+    print_contest_summary(results)
+
+    failed = [problem for problem, (ret, _) in export_results.unwrap().items() if ret.is_err()]
+    failed += [problem for problem, (ret, _, _) in results.items() if ret.is_err()]
+    if failed:
+        return Err(f"{len(failed)} of {len(export_results.unwrap())} problems failed: {', '.join(map(str, failed))}")
+
+    return Ok("Contest imported")
+
+def polygon_client_settings(pool_size, timeout, retries, keep_alive, max_in_flight, rate, max_rate, target_latency):
+    return dict(
+        pool_size=max(pool_size, max_in_flight),
+        timeout=(10, timeout),
+        retries=retries,
+        keep_alive=keep_alive,
+        max_in_flight=max_in_flight,
+        rate_limiter=AdaptiveRateLimiter(rate=rate, max_rate=max(rate, max_rate), target_latency=target_latency),
+    )
+
+def configure_polygon(pool_size, timeout, retries, keep_alive, max_in_flight, rate, max_rate, target_latency):
+    configure_client(**polygon_client_settings(pool_size, timeout, retries, keep_alive, max_in_flight, rate, max_rate, target_latency))
+
+# With several API keys, give every key its own client (connections, request
+# cap and rate limiter) and return the pool spreading problems over them
+def configure_credentials(credentials, problem_cache, problem_cache_ttl, pool_size, timeout, retries, keep_alive, max_in_flight, rate, max_rate, target_latency):
+    if len(credentials) < 2:
+        return None
+
+    for api_key, _ in credentials:
+        configure_key_client(api_key, **polygon_client_settings(pool_size, timeout, retries, keep_alive, max_in_flight, rate, max_rate, target_latency))
+    click.echo(f"Spreading problems over {len(credentials)} API keys")
+
+    return CredentialPool(credentials, problem_cache, problem_cache_ttl)
+
+# Everything an upload command sets up from the upload options it shares with
+# the others: Polygon clients, the problem index, builds, journal and profile.
+# close() writes what is left and prints the reports of the run.
+class UploadRun:
+    def __init__(self, credentials, name_prefix=None, pool_size=10, timeout=300.0, retries=3, no_keep_alive=False, test_workers=8, step_workers=4, problem_workers=4, max_in_flight=16, problem_cache=None, problem_cache_ttl=24 * 60 * 60, sync=False, statement_cache="./statement_cache", rate=10.0, max_rate=200.0, target_latency=None, wait_builds=False, build_timeout=30 * 60, profile=None, journal="./upload_journal.jsonl", resume=False, key_max_in_flight=None):
+        self.api_key, self.api_secret = credentials[0]
+        self.name_prefix = name_prefix
+        self.test_workers = test_workers
+        self.step_workers = step_workers
+        self.problem_workers = problem_workers
+        self.sync = sync
+
+        polygon_api_calls.statement_cache_dir = statement_cache
+        configure_polygon(pool_size, timeout, retries, not no_keep_alive, max_in_flight, rate, max_rate, target_latency)
+        self.credentials = configure_credentials(credentials, problem_cache, problem_cache_ttl, pool_size, timeout, retries, not no_keep_alive, key_max_in_flight or max_in_flight, rate, max_rate, target_latency)
+
+        if profile is not None:
+            configure_tracer(profile)
+
+        self.problem_index = ProblemIndex(self.api_key, self.api_secret, problem_cache, problem_cache_ttl)
+        self.builds = BuildQueue(timeout=build_timeout) if wait_builds else None
+        self.journal = Journal(journal or None, resume)
+
+    # (api_key, api_secret, problem_index) to upload the problem with
+    def assign(self, problem_name):
+        if self.credentials is None:
+            return self.api_key, self.api_secret, self.problem_index
+        return self.credentials.assign(problem_name)
+
+    def close(self):
+        self.journal.close()
+        print_share_report(self.credentials)
+
+        if self.builds is not None:
+            print_build_summary(self.builds.wait())
+
+        print_profile()